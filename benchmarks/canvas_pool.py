@@ -0,0 +1,107 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Compare the figure throughput of fresh canvases and a canvas pool.
+
+The same figures (a histogram, the CMS labels, and optionally a saved file)
+are produced once creating and closing a canvas for each of them and once
+reusing canvases from a `CanvasPool`, reporting the figures per second and
+the resident memory growth of each approach. Usage:
+
+    python benchmarks/canvas_pool.py [--figures N] [--format EXT]
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+
+import ROOT
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+ROOT.gROOT.SetBatch(True)
+
+import cms_figure
+
+
+def rss_mb():
+    """Return the current resident memory of the process in MB (Linux only)."""
+    with open('/proc/self/statm') as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * 4096 / 1024.0 ** 2
+
+
+def draw_figure(canvas, hist, path):
+    """Draw and label a figure on a canvas, saving it if a path is given."""
+    hist.Draw('hist')
+    cms_figure.draw_labels('19.7 fb^{-1} (8 TeV)', extra_text='Preliminary', pad=canvas)
+    if path:
+        canvas.SaveAs(path)
+
+
+def run_fresh(figures, hist, paths):
+    """Produce the figures on a new canvas each."""
+    for index in range(figures):
+        canvas = ROOT.TCanvas('canvas_{0}'.format(index), '')
+        draw_figure(canvas, hist, paths[index])
+        canvas.Close()
+
+
+def run_pooled(figures, hist, paths):
+    """Produce the figures on canvases reused from a pool."""
+    with cms_figure.CanvasPool() as pool:
+        for index in range(figures):
+            with pool.canvas() as canvas:
+                draw_figure(canvas, hist, paths[index])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--figures', type=int, default=2000, help='the number of figures')
+    parser.add_argument('--format', help='the output file extension (default: no files are saved)')
+    args = parser.parse_args()
+    ROOT.gErrorIgnoreLevel = ROOT.kWarning
+    hist = ROOT.TH1F('hist', '', 50, -3, 3)
+    hist.FillRandom('gaus', 10000)
+    directory = tempfile.mkdtemp(prefix='cms_figure_pool_')
+    paths = [
+        '{0}/figure_{1}.{2}'.format(directory, index, args.format) if args.format else None
+        for index in range(args.figures)
+    ]
+    try:
+        with cms_figure.get_style():
+            # Warm up ROOT's graphics and the style before timing.
+            run_fresh(10, hist, paths)
+            for name, run in [('fresh', run_fresh), ('pooled', run_pooled)]:
+                rss = rss_mb()
+                start = time.time()
+                run(args.figures, hist, paths)
+                seconds = time.time() - start
+                sys.stdout.write('{0:<8}{1:8.2f} s  {2:8.1f} figures/s  RSS growth {3:6.2f} MB\n'.format(
+                    name, seconds, args.figures / seconds, rss_mb() - rss))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Compare the cost of importing cms_figure with and without loading ROOT.
+
+Each measurement runs in a fresh interpreter, so the import caches of one
+run cannot flatter the next. Usage:
+
+    python benchmarks/import_time.py [--repeat N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+
+STATEMENTS = [
+    ('import cms_figure', 'import cms_figure'),
+    ('import cms_figure (layout only)', 'import cms_figure.layout'),
+    ('cms_figure.TDRStyle (loads ROOT)', 'import cms_figure; cms_figure.TDRStyle'),
+]
+
+# Print the peak resident memory of the interpreter in kilobytes on exit.
+MEMORY_PROBE = '; import resource; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)'
+
+
+def measure(statement, repeat):
+    """Return the best wall time in seconds and the peak RSS in MB of a statement."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best_time, peak_rss = float('inf'), 0.0
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(repeat):
+            start = time.time()
+            output = subprocess.check_output([sys.executable, '-c', statement + MEMORY_PROBE], cwd=root, stderr=devnull)
+            best_time = min(best_time, time.time() - start)
+            peak_rss = max(peak_rss, int(output.split()[-1]) / 1024.0)
+    return best_time, peak_rss
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='the number of runs per statement')
+    args = parser.parse_args()
+    sys.stdout.write('{0:<36}{1:>12}{2:>14}\n'.format('statement', 'time [s]', 'peak RSS [MB]'))
+    for name, statement in STATEMENTS:
+        try:
+            best_time, peak_rss = measure(statement, args.repeat)
+        except subprocess.CalledProcessError:
+            sys.stdout.write('{0:<36}{1:>12}\n'.format(name, 'failed'))
+            continue
+        sys.stdout.write('{0:<36}{1:>12.3f}{2:>14.1f}\n'.format(name, best_time, peak_rss))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Benchmark the style, the labels, and end-to-end figure output.
+
+The benchmarks run ROOT in batch mode, so no display is needed. The timings
+are in seconds per call, except for the figure throughput in figures per
+second and the memory growth in MB. The results are written as JSON, and
+can be compared against a stored baseline to flag any benchmark that became
+slower (or grew more memory) by more than a threshold. Usage:
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --output results.json --compare baseline.json
+
+The exit status is non-zero if any regression is flagged.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import ROOT
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+ROOT.gROOT.SetBatch(True)
+ROOT.gErrorIgnoreLevel = ROOT.kWarning
+
+import cms_figure
+
+LUMI_TEXT = '19.7 fb^{-1} (8 TeV) + 4.9 fb^{-1} (7 TeV)'
+
+
+def rss_mb():
+    """Return the current resident memory of the process in MB (Linux only)."""
+    with open('/proc/self/statm') as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * 4096 / 1024.0 ** 2
+
+
+def time_per_call(function, number, repeat=3):
+    """Return the best time in seconds per call of a function over several repeats."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.time()
+        for _ in range(number):
+            function()
+        best = min(best, (time.time() - start) / number)
+    return best
+
+
+def remove_primitives(pad, count):
+    """Remove and delete the primitives of a pad beyond its first `count` ones.
+
+    Unlike clearing the pad, this only deletes the labels drawn by a timed
+    call, so the timings are not dominated by the clearing.
+    """
+    primitives = pad.GetListOfPrimitives()
+    while primitives.GetSize() > count:
+        primitive = primitives.Last()
+        primitives.Remove(primitive)
+        ROOT.SetOwnership(primitive, True)
+        del primitive
+
+
+def bench_style(number):
+    """Time the style construction and the context enter and exit."""
+    results = {'style_construction': time_per_call(cms_figure.TDRStyle, number // 10 or 1)}
+    style = cms_figure.get_style()
+
+    def enter_exit():
+        with style:
+            pass
+
+    results['style_context'] = time_per_call(enter_exit, number)
+    return results
+
+
+def bench_labels(number):
+    """Time drawing each label position with and without a sublabel."""
+    results = {}
+    canvas = ROOT.TCanvas('bench_labels', '')
+    count = canvas.GetListOfPrimitives().GetSize()
+    for position in ['left', 'center', 'right', 'outside']:
+        for extra_text in ['', 'Preliminary']:
+            label = cms_figure.CMSLabel()
+            label.position = position
+            label.sublabel.text = extra_text
+
+            def draw():
+                label.draw()
+                # Keep the primitive list from growing across calls.
+                remove_primitives(canvas, count)
+
+            name = 'cms_label_{0}{1}'.format(position, '_sublabel' if extra_text else '')
+            results[name] = time_per_call(draw, number)
+    lumi_label = cms_figure.LuminosityLabel(LUMI_TEXT)
+
+    def draw_lumi():
+        lumi_label.draw()
+        remove_primitives(canvas, count)
+
+    results['lumi_label'] = time_per_call(draw_lumi, number)
+
+    def draw_labels():
+        cms_figure.draw_labels(LUMI_TEXT, 'left', 'Preliminary')
+        remove_primitives(canvas, count)
+
+    results['draw_labels'] = time_per_call(draw_labels, number)
+    canvas.Close()
+    return results
+
+
+def bench_output(figures, formats):
+    """Measure the figure throughput and memory growth of drawing and saving figures."""
+    results = {}
+    directory = tempfile.mkdtemp(prefix='cms_figure_bench_')
+    hist = ROOT.TH1F('bench_hist', '', 50, -3, 3)
+    hist.FillRandom('gaus', 10000)
+    try:
+        for extension in formats:
+            rss_before = rss_mb()
+            start = time.time()
+            for index in range(figures):
+                canvas = ROOT.TCanvas('bench_output', '')
+                hist.Draw('hist')
+                cms_figure.draw_labels(LUMI_TEXT, 'left', 'Preliminary')
+                canvas.SaveAs(os.path.join(directory, 'figure_{0}.{1}'.format(index, extension)))
+                canvas.Close()
+            elapsed = time.time() - start
+            results['saveas_{0}_figures_per_second'.format(extension)] = figures / elapsed
+            results['saveas_{0}_rss_growth_mb'.format(extension)] = rss_mb() - rss_before
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+
+# Whether a larger value of a result is better, keyed by the result name suffix.
+HIGHER_IS_BETTER = ('_figures_per_second',)
+
+
+def compare(results, baseline, threshold):
+    """Return the descriptions of the results that regressed relative to the baseline."""
+    regressions = []
+    for name, value in sorted(results.items()):
+        if name not in baseline:
+            continue
+        reference = baseline[name]
+        if name.endswith(HIGHER_IS_BETTER):
+            regressed = value < reference * (1 - threshold)
+        elif name.endswith('_rss_growth_mb'):
+            # Memory growth is compared in absolute terms since it is ideally zero.
+            regressed = value > reference + max(1.0, abs(reference) * threshold)
+        else:
+            regressed = value > reference * (1 + threshold)
+        if regressed:
+            regressions.append('{0}: {1:.6g} (baseline {2:.6g})'.format(name, value, reference))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='benchmark_results.json', help='the path of the results file')
+    parser.add_argument('--compare', metavar='BASELINE', help='the path of a baseline results file')
+    parser.add_argument('--threshold', type=float, default=0.1, help='the tolerated relative slowdown')
+    parser.add_argument('--number', type=int, default=1000, help='the number of calls per timing')
+    parser.add_argument('--figures', type=int, default=1000, help='the number of figures saved per format')
+    parser.add_argument('--formats', default='pdf,png', help='the comma separated output formats')
+    args = parser.parse_args()
+
+    results = {}
+    with cms_figure.get_style():
+        results.update(bench_style(args.number))
+        results.update(bench_labels(args.number))
+        results.update(bench_output(args.figures, args.formats.split(',')))
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'root': ROOT.gROOT.GetVersion(),
+            'cms_figure': cms_figure.__version__,
+            'machine': platform.machine(),
+            'timestamp': time.time(),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    for name, value in sorted(results.items()):
+        sys.stdout.write('{0:<40}{1:>14.6g}\n'.format(name, value))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            sys.stdout.write('REGRESSION {0}\n'.format(regression))
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
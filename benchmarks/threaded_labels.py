@@ -0,0 +1,111 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Label and save canvases from a pool of threads in a single process.
+
+ROOT's thread safety is enabled and every figure is drawn, labelled with an
+explicit pad, and saved on a worker thread without touching gPad from the
+labelling code. The same figures are then produced serially for comparison.
+Every canvas is checked for its label primitives, and the script exits with
+a non-zero status if any are missing. Usage:
+
+    python benchmarks/threaded_labels.py [--figures N] [--threads N] [--format EXT]
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from multiprocessing.pool import ThreadPool
+
+import ROOT
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+ROOT.gROOT.SetBatch(True)
+ROOT.EnableThreadSafety()
+
+import cms_figure
+
+
+def make_figure(index, directory, extension):
+    """Draw, label, and save a figure, returning whether all of its labels were drawn."""
+    canvas = ROOT.TCanvas('canvas_{0}'.format(index), '', 600, 600)
+    hist = ROOT.TH1F('hist_{0}'.format(index), '', 50, -3, 3)
+    hist.SetDirectory(0)
+    random = ROOT.TRandom3(index + 1)
+    for _ in range(1000):
+        hist.Fill(random.Gaus())
+    # Drawing a histogram still goes through gPad, which is kept per thread.
+    canvas.cd()
+    hist.Draw('hist')
+    cms_figure.draw_labels('19.7 fb^{-1} (8 TeV)', extra_text='Preliminary', pad=canvas)
+    primitives = canvas.GetListOfPrimitives()
+    labelled = all(primitives.FindObject(name) for name in (
+        cms_figure.LabelRenderer.CMS_LABEL_NAME,
+        cms_figure.LabelRenderer.CMS_SUBLABEL_NAME,
+        cms_figure.LabelRenderer.LUMI_LABEL_NAME,
+    ))
+    canvas.SaveAs('{0}/figure_{1}.{2}'.format(directory, index, extension))
+    canvas.Close()
+    return labelled
+
+
+def run(figures, threads, directory, extension):
+    """Produce the figures and return the wall time and the number of unlabelled figures."""
+    start = time.time()
+    if threads > 1:
+        pool = ThreadPool(threads)
+        try:
+            labelled = pool.map(lambda index: make_figure(index, directory, extension), range(figures))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        labelled = [make_figure(index, directory, extension) for index in range(figures)]
+    return time.time() - start, labelled.count(False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--figures', type=int, default=200, help='the number of figures')
+    parser.add_argument('--threads', type=int, default=4, help='the number of worker threads')
+    parser.add_argument('--format', default='pdf', help='the output file extension')
+    args = parser.parse_args()
+    ROOT.gErrorIgnoreLevel = ROOT.kWarning
+    directory = tempfile.mkdtemp(prefix='cms_figure_threads_')
+    failed = False
+    try:
+        # The style is entered once, since gStyle is shared by all threads.
+        with cms_figure.get_style():
+            for name, threads in [('serial', 1), ('{0} threads'.format(args.threads), args.threads)]:
+                seconds, unlabelled = run(args.figures, threads, directory, args.format)
+                failed = failed or unlabelled > 0
+                sys.stdout.write('{0:<12}{1:8.2f} s  {2:8.1f} figures/s  {3} unlabelled\n'.format(
+                    name, seconds, args.figures / seconds, unlabelled))
+    finally:
+        shutil.rmtree(directory)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Compare saving figures as PNG files with exporting them as JSROOT JSON.
+
+The same labelled figures are saved as PNG files by ROOT and exported by a
+`GalleryExporter`, with and without compression, reporting the time per
+figure and the mean file size of each approach. Usage:
+
+    python benchmarks/web_export.py [--figures N]
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import ROOT
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+ROOT.gROOT.SetBatch(True)
+
+import cms_figure
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--figures', type=int, default=200, help='the number of figures')
+    args = parser.parse_args()
+    ROOT.gErrorIgnoreLevel = ROOT.kWarning
+    root_directory = tempfile.mkdtemp(prefix='cms_figure_web_')
+    try:
+        with cms_figure.get_style():
+            canvas = ROOT.TCanvas('canvas', '')
+            hist = ROOT.TH1F('hist', '', 50, -3, 3)
+            hist.FillRandom('gaus', 10000)
+            hist.Draw('hist')
+            cms_figure.draw_labels('19.7 fb^{-1} (8 TeV)', extra_text='Preliminary', pad=canvas)
+            canvas.Update()
+            for name in ['png', 'json', 'json.gz']:
+                directory = os.path.join(root_directory, name)
+                os.makedirs(directory)
+                start = time.time()
+                if name == 'png':
+                    for index in range(args.figures):
+                        canvas.SaveAs(os.path.join(directory, 'figure_{0}.png'.format(index)))
+                else:
+                    with cms_figure.GalleryExporter(directory, compress=name.endswith('.gz')) as gallery:
+                        for index in range(args.figures):
+                            gallery.add(canvas, 'figure {0}'.format(index))
+                seconds = time.time() - start
+                paths = glob.glob(os.path.join(directory, 'figure*'))
+                size = sum(os.path.getsize(path) for path in paths) / float(len(paths))
+                sys.stdout.write('{0:<8}{1:8.2f} ms/figure  {2:8.1f} kB/figure\n'.format(
+                    name, 1000 * seconds / args.figures, size / 1024))
+            canvas.Close()
+    finally:
+        shutil.rmtree(root_directory)
+
+
+if __name__ == '__main__':
+    main()
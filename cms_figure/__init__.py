@@ -35,19 +35,131 @@ using ROOT according to the CMS Publication Committee standards.
 
 __version__ = '0.9.0'
 
-# Core classes
-from .labels import CMSLabel, LuminosityLabel
+import importlib
+import sys
+import types
 
-from .tdr_style import TDRStyle
+# Instrumentation
+from .instrument import collect_stats, disable_stats, enable_stats, reset_stats, stats
 
-# Utilities
-from .utils import draw_labels
+# Figure cache
+from .cache import FigureCache, figure_key
+
+# Style definitions
+from .style_spec import StyleSpec, TDR_STYLE_SPEC
+
+# Batch processing
+from .batch import FigureJob, render_batch
+
+# The public attributes of the submodules that import ROOT, which are only
+# imported on first access so that importing the package itself stays cheap.
+_LAZY_ATTRIBUTES = {
+    # Core classes
+    'CMSLabel': 'labels',
+    'LuminosityLabel': 'labels',
+    'TDRStyle': 'tdr_style',
+
+    # Style registry
+    'get_style': 'tdr_style',
+
+    # Utilities
+    'FigureExporter': 'utils',
+    'GalleryExporter': 'web',
+    'PDFBooklet': 'booklet',
+    'LabelRenderer': 'utils',
+    'draw_canvas_labels': 'utils',
+    'draw_labels': 'utils',
+
+    # Drawing sessions
+    'CanvasPool': 'canvas_pool',
+    'DrawingSession': 'session',
+
+    # Layout checks
+    'auto_position': 'auto_placement',
+    'check_overlaps': 'overlaps',
+    'measure_text': 'overlaps',
+
+    # Decimation
+    'decimate': 'decimation',
+
+    # Luminosity text
+    'build_lumi_text': 'lumi',
+    'integrated_luminosity': 'lumi',
+}
 
 __all__ = [
     # Core classes
     'CMSLabel', 'LuminosityLabel', 'TDRStyle',
 
+    # Style registry
+    'get_style',
+
+    # Style definitions
+    'StyleSpec', 'TDR_STYLE_SPEC',
+
     # Utilities
-    'draw_labels',
+    'FigureExporter', 'GalleryExporter', 'LabelRenderer', 'PDFBooklet', 'draw_canvas_labels', 'draw_labels',
+
+    # Drawing sessions
+    'CanvasPool', 'DrawingSession',
+
+    # Layout checks
+    'auto_position', 'check_overlaps', 'measure_text',
+
+    # Decimation
+    'decimate',
+
+    # Luminosity text
+    'build_lumi_text', 'integrated_luminosity',
+
+    # Batch processing
+    'FigureJob', 'render_batch',
+
+    # Figure cache
+    'FigureCache', 'figure_key',
+
+    # Instrumentation
+    'collect_stats', 'disable_stats', 'enable_stats', 'reset_stats', 'stats',
 ]
 
+
+def _load_attribute(name):
+    """Import the submodule providing a ROOT-dependent attribute and return the attribute."""
+    try:
+        module_name = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
+    return getattr(importlib.import_module('.' + module_name, __name__), name)
+
+
+def __getattr__(name):
+    """Import the ROOT-dependent attributes on first access (PEP 562)."""
+    value = globals()[name] = _load_attribute(name)
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+class _LazyModule(types.ModuleType):
+    """The package module for interpreters without module level __getattr__ (Python < 3.7)."""
+
+    def __getattr__(self, name):
+        value = _load_attribute(name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(_LAZY_ATTRIBUTES))
+
+
+if sys.version_info < (3, 7):
+    # Module level __getattr__ is unsupported, so the package is replaced by
+    # an instance of a module subclass defining it.
+    _module = _LazyModule(__name__, __doc__)
+    _module.__dict__.update(globals())
+    # Python 2 clears the globals of a deallocated module, which the functions
+    # above still use, so the original module is kept alive.
+    _module._original_module = sys.modules[__name__]
+    sys.modules[__name__] = _module
@@ -0,0 +1,194 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Automatic placement of the CMS label clear of the drawn data.
+
+The contents of the histograms, stacks, and graphs drawn on a pad are
+extracted as NumPy arrays, and the top of the data under each candidate label
+position is found with vectorized operations. The first position whose label
+box is clear of the data is chosen. If none is, either the label is moved
+outside of the frame or the frame maximum is raised just enough to clear the
+label. This module requires NumPy.
+"""
+
+import numpy as np
+
+import ROOT
+
+from .buffers import as_array, bin_edges, hist_dtype
+from .instrument import instrument
+from .layout import Box, text_box
+from .overlaps import measure_text
+from .session import current_session
+
+
+# The candidate positions inside of the frame, in order of preference.
+CANDIDATE_POSITIONS = ('left', 'center', 'right')
+
+def hist_arrays(hist):
+    """Return the low bin edges, high bin edges, and tops of the error bars of a 1D histogram."""
+    nbins = hist.GetXaxis().GetNbins()
+    edges = bin_edges(hist.GetXaxis())
+    contents = as_array(hist.GetArray(), hist_dtype(hist), nbins + 2)[1:-1]
+    if hist.GetSumw2N():
+        errors = np.sqrt(as_array(hist.GetSumw2().GetArray(), 'f8', nbins + 2)[1:-1])
+    else:
+        errors = np.sqrt(np.abs(contents))
+    return edges[:-1], edges[1:], contents + errors
+
+
+def graph_arrays(graph):
+    """Return the x values (twice, as low and high edges) and tops of the error bars of a graph."""
+    n = graph.GetN()
+    x = as_array(graph.GetX(), 'f8', n)
+    y = as_array(graph.GetY(), 'f8', n)
+    if graph.InheritsFrom('TGraphAsymmErrors'):
+        y = y + as_array(graph.GetEYhigh(), 'f8', n)
+    elif graph.InheritsFrom('TGraphErrors'):
+        y = y + as_array(graph.GetEY(), 'f8', n)
+    return x, x, y
+
+
+def pad_data(pad):
+    """Return the concatenated low x, high x, and top y arrays of the data drawn on a pad.
+
+    One dimensional histograms, stacks, and graphs are included. The tops of
+    a stack are those of its sum, unless it is drawn with the "nostack" option.
+    """
+    arrays = []
+    link = pad.GetListOfPrimitives().FirstLink()
+    while link:
+        obj, option = link.GetObject(), link.GetOption().lower()
+        if obj.InheritsFrom('TH1') and obj.GetDimension() == 1:
+            arrays.append(hist_arrays(obj))
+        elif obj.InheritsFrom('THStack') and obj.GetHists():
+            if 'nostack' in option or not obj.GetStack():
+                arrays.extend(hist_arrays(hist) for hist in obj.GetHists())
+            else:
+                arrays.append(hist_arrays(obj.GetStack().Last()))
+        elif obj.InheritsFrom('TGraph'):
+            arrays.append(graph_arrays(obj))
+        link = link.Next()
+    if not arrays:
+        empty = np.zeros(0)
+        return empty, empty, empty
+    return tuple(np.concatenate(column) for column in zip(*arrays))
+
+
+def _frame_histogram(pad):
+    """Return the histogram or stack whose maximum sets the frame's y range, if any."""
+    for obj in pad.GetListOfPrimitives():
+        if obj.InheritsFrom('TH1') or obj.InheritsFrom('THStack'):
+            return obj
+    return None
+
+
+def label_box(cms_label, margins, pad, scale_factor=1.0):
+    """Return the box covered by a CMS label and its sublabel at their current position."""
+    label_placement, sublabel_placement = cms_label.layout(margins, scale_factor)
+    width, height = measure_text(cms_label.text, cms_label.font, label_placement.size, pad)
+    box = text_box(label_placement, width, height)
+    if sublabel_placement is not None:
+        sublabel = cms_label.sublabel
+        width, height = measure_text(sublabel.text, sublabel.font, sublabel_placement.size, pad)
+        sub_box = text_box(sublabel_placement, width, height)
+        box = Box(min(box.x1, sub_box.x1), min(box.y1, sub_box.y1), max(box.x2, sub_box.x2), max(box.y2, sub_box.y2))
+    return box
+
+
+@instrument('auto_position')
+def auto_position(cms_label, pad=None, headroom=True, scale_factor=1.0):
+    """Choose the position of a CMS label that keeps it clear of the drawn data.
+
+    The pad is updated once so that its frame ranges are known. Inside of a
+    `DrawingSession`, the update goes through the session, which paints the
+    canvas and drops the update it held back for it. The candidate
+    positions inside of the frame are tried in the order of
+    `CANDIDATE_POSITIONS`, and the first one whose label box is clear of the
+    data is returned. If there is none, then either the frame maximum is raised
+    by the least amount that clears the label at one of the candidates, which
+    is returned, or "outside" is returned.
+
+    Parameters
+    ----------
+    cms_label : CMSLabel
+        The label to place, with its sublabel text already set.
+    pad : TPad, optional
+        The pad the label will be drawn on. The default is the active pad.
+    headroom : bool, optional
+        Whether to raise the frame maximum rather than fall back to placing
+        the label outside of the frame. The default is True.
+    scale_factor : float, optional
+        A factor applied to the label's text size scale. The default is 1.0.
+
+    Returns
+    -------
+    string
+        The chosen label position.
+    """
+    pad = pad or ROOT.gPad
+    session = current_session()
+    if session is None:
+        pad.Update()
+    else:
+        # The frame ranges are needed now, so the held back updates can't wait.
+        session.defer(pad)
+        session.flush(pad.GetCanvas())
+    x_low, x_high, y_top = pad_data(pad)
+    if not y_top.size:
+        return CANDIDATE_POSITIONS[0]
+    margins = (pad.GetTopMargin(), pad.GetRightMargin(), pad.GetBottomMargin(), pad.GetLeftMargin())
+    top_margin, right_margin, bottom_margin, left_margin = margins
+    ux_min, ux_max, uy_min, uy_max = pad.GetUxmin(), pad.GetUxmax(), pad.GetUymin(), pad.GetUymax()
+    # The frame ranges are in log10 units on log scale axes.
+    if pad.GetLogx():
+        x_low, x_high = np.log10(np.clip(x_low, 1e-300, None)), np.log10(np.clip(x_high, 1e-300, None))
+    if pad.GetLogy():
+        y_top = np.log10(np.clip(y_top, 1e-300, None))
+    original_position = cms_label.position
+    needed = {}
+    try:
+        for position in CANDIDATE_POSITIONS:
+            cms_label.position = position
+            box = label_box(cms_label, margins, pad, scale_factor)
+            x1 = ux_min + (box.x1 - left_margin) / (1 - left_margin - right_margin) * (ux_max - ux_min)
+            x2 = ux_min + (box.x2 - left_margin) / (1 - left_margin - right_margin) * (ux_max - ux_min)
+            covered = (x_high > x1) & (x_low < x2)
+            if not covered.any():
+                return position
+            data_top = y_top[covered].max()
+            # The fraction of the frame height below the bottom of the label.
+            clear_fraction = (box.y1 - bottom_margin) / (1 - top_margin - bottom_margin)
+            if data_top < uy_min + clear_fraction * (uy_max - uy_min):
+                return position
+            if clear_fraction > 0:
+                needed[position] = uy_min + (data_top - uy_min) / clear_fraction
+    finally:
+        cms_label.position = original_position
+    frame = _frame_histogram(pad)
+    if not headroom or not needed or frame is None:
+        return 'outside'
+    position = min(needed, key=needed.get)
+    maximum = needed[position]
+    frame.SetMaximum(10 ** maximum if pad.GetLogy() else maximum)
+    pad.Modified()
+    return position
@@ -0,0 +1,398 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import errno
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import traceback
+from collections import OrderedDict, namedtuple
+
+try:
+    from multiprocessing import SimpleQueue
+except ImportError:  # Python 2
+    from multiprocessing.queues import SimpleQueue
+
+from .compat import string_types
+
+# The P-TDR style built once per worker process by init_worker.
+_worker_style = None
+
+# The canvases reused by the jobs of a worker process.
+_worker_canvases = None
+
+# The queue on which a worker process announces the jobs it starts.
+_worker_started = None
+
+# The formatted traceback of the error raised while preparing a worker process.
+_worker_error = None
+
+# The interval in seconds at which render_batch checks its jobs and workers.
+POLL_INTERVAL = 0.1
+
+# The time in seconds for which the result of a job may still arrive after
+# its worker process exited before the job is considered lost.
+DEAD_WORKER_GRACE = 5.0
+
+
+class FigureJob(object):
+    """A figure to be drawn, labelled, and saved by a batch worker process.
+
+    Jobs are sent to the worker processes by pickling, so the drawing callable
+    and its arguments must be picklable. In practice, this means the callable
+    should be a function defined at the top level of a module.
+
+    Parameters
+    ----------
+    draw : callable
+        The function drawing the figure's contents. It is called with the
+        cleared canvas followed by the elements of `args`. ROOT objects
+        created inside of the function are deleted once Python garbage collects
+        them, so the function must return any objects that it draws in order to
+        keep them alive until the canvas is saved.
+    outputs : string or list of strings
+        The output file path(s) passed to the canvas's SaveAs method.
+    lumi_text : string
+        The luminosity label text. Data taking periods must be separated by
+        the "+" symbol, e.g. "19.7 fb^{-1} (8 TeV) + 4.9 fb^{-1} (7 TeV)".
+    cms_position : string, optional
+        The CMS label position on the canvas. The default is "left".
+        See `draw_labels` for the available positions.
+    extra_text : string, optional
+        The sublabel text for the CMS label. The default is an empty string
+        for no sublabel.
+    args : tuple, optional
+        Additional positional arguments passed to `draw`.
+    title : string, optional
+        The title of the figure given to the sink of `render_batch`, such as
+        the page bookmark of a `PDFBooklet`. The default is None.
+    """
+    def __init__(self, draw, outputs, lumi_text, cms_position='left', extra_text='', args=(), title=None):
+        self.draw = draw
+        self.outputs = [outputs] if isinstance(outputs, string_types) else list(outputs)
+        self.lumi_text = lumi_text
+        self.cms_position = cms_position
+        self.extra_text = extra_text
+        self.args = tuple(args)
+        self.title = title
+
+
+class JobResult(namedtuple('JobResult', ['index', 'outputs', 'error'])):
+    """The outcome of a batch figure job.
+
+    index : int
+        The position of the job in the sequence passed to `render_batch`.
+    outputs : list of strings
+        The output file paths of the job.
+    error : string or None
+        The formatted traceback if the job failed, otherwise None.
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def init_worker(started=None):
+    """Prepare a worker process to draw figures.
+
+    ROOT is imported, switched to batch mode, and the P-TDR style is built and
+    activated once per process so that jobs only pay for their own drawing.
+    The jobs draw on canvases from a pool kept by the process. Other process
+    pools drawing figures, such as those of the plotting daemon and the
+    cms-figure command, use it as their initializer as well.
+
+    Parameters
+    ----------
+    started : SimpleQueue, optional
+        The `started` queue of the `WorkerMonitor` of the pool, to which the
+        process announces the jobs it starts. The default is None.
+
+    An error raised while preparing the process, e.g. because ROOT can't be
+    imported, is not propagated, since the pool would then replace the process
+    over and over again. Its traceback is kept instead and reported as the
+    error of every job the process is given.
+    """
+    global _worker_style, _worker_canvases, _worker_started, _worker_error
+    _worker_started = started
+    try:
+        import ROOT
+        ROOT.PyConfig.IgnoreCommandLineOptions = True
+        ROOT.gROOT.SetBatch(True)
+        ROOT.gErrorIgnoreLevel = ROOT.kWarning
+        from .canvas_pool import CanvasPool
+        from .tdr_style import get_style
+        _worker_style = get_style()
+        _worker_style.cd()
+        _worker_canvases = CanvasPool(_worker_style, max_idle=1)
+    except Exception:
+        _worker_error = traceback.format_exc()
+
+
+def announce_job(token):
+    """Tell the `WorkerMonitor` of the pool that this worker process starts a job.
+
+    Parameters
+    ----------
+    token : hashable
+        The identifier of the job, unique among the jobs of the pool.
+    """
+    if _worker_started is not None:
+        _worker_started.put((token, os.getpid()))
+
+
+def _render_job(indexed_job, serialize=False):
+    """Draw, label, and save a single figure job inside a worker process.
+
+    Returns the job result and, if requested, the pickled canvas.
+    """
+    index, job = indexed_job
+    announce_job(index)
+    if _worker_error is not None:
+        return JobResult(index, job.outputs, _worker_error), None
+    from .utils import draw_labels
+    canvas = _worker_canvases.acquire()
+    try:
+        # Hold a reference to whatever was drawn until the canvas is saved.
+        drawn = job.draw(canvas, *job.args)
+        canvas.cd()
+        draw_labels(job.lumi_text, job.cms_position, job.extra_text)
+        for output in job.outputs:
+            canvas.SaveAs(output)
+        # The canvas is pickled before it is cleared for the next job.
+        payload = pickle.dumps(canvas, pickle.HIGHEST_PROTOCOL) if serialize else None
+        del drawn
+    except Exception:
+        return JobResult(index, job.outputs, traceback.format_exc()), None
+    finally:
+        _worker_canvases.release(canvas)
+    return JobResult(index, job.outputs, None), payload
+
+
+def _run_job(indexed_job):
+    """Draw, label, and save a single figure job, returning its result."""
+    return _render_job(indexed_job)[0]
+
+
+def _run_sink_job(indexed_job):
+    """Draw, label, and save a single figure job for a sink.
+
+    Returns the job result, the pickled canvas, and the job title.
+    """
+    result, payload = _render_job(indexed_job, serialize=True)
+    return result, payload, indexed_job[1].title
+
+
+def _run_chunk(run, indexed_jobs):
+    """Run a chunk of figure jobs in a worker process, returning their outputs."""
+    return [run(indexed_job) for indexed_job in indexed_jobs]
+
+
+def _process_alive(pid):
+    """Return whether the process with the given ID still exists."""
+    try:
+        os.kill(pid, 0)
+    except OSError as error:
+        return error.errno == errno.EPERM
+    return True
+
+
+class WorkerMonitor(object):
+    """Finds the jobs of a process pool that were lost with a dead worker process.
+
+    When a worker dies, e.g. through a segmentation fault in ROOT, the pool
+    replaces it but never completes the task it was running, so waiting for
+    the result of that task blocks forever. The workers of a pool initialized
+    by `init_worker` with the `started` queue of a monitor announce every job
+    they start with `announce_job`, which lets the monitor tell which jobs
+    were running on a worker that died. A monitor can be shared by several
+    threads waiting for the jobs of the same pool.
+
+        monitor = WorkerMonitor()
+        pool = multiprocessing.Pool(initializer=init_worker, initargs=(monitor.started,))
+
+    Attributes
+    ----------
+    started : SimpleQueue
+        The queue on which the workers announce the jobs they start.
+    """
+    def __init__(self):
+        self.started = SimpleQueue()
+        self._lock = threading.Lock()
+        # The started jobs, mapped to the process ID of their worker, in the order they started.
+        self._running = OrderedDict()
+        # The time at which the workers were first seen dead.
+        self._dead_since = {}
+
+    def _drain(self):
+        while not self.started.empty():
+            token, pid = self.started.get()
+            self._running.pop(token, None)
+            self._running[token] = pid
+
+    def lost(self):
+        """Return the started jobs whose worker died.
+
+        A worker is only considered dead `DEAD_WORKER_GRACE` seconds after it
+        exited, since the results of its last jobs may still be on their way.
+
+        Returns
+        -------
+        dict
+            The lists of jobs that were started by each dead worker, in the
+            order they started, keyed by the process ID of the worker. The
+            last job of a list is the one running when the worker died.
+        """
+        with self._lock:
+            self._drain()
+            now = time.time()
+            pids = set(self._running.values())
+            for pid in list(self._dead_since):
+                if pid not in pids:
+                    del self._dead_since[pid]
+            dead = set(
+                pid for pid in pids
+                if not _process_alive(pid) and now - self._dead_since.setdefault(pid, now) >= DEAD_WORKER_GRACE
+            )
+            lost = {}
+            for token, pid in self._running.items():
+                if pid in dead:
+                    lost.setdefault(pid, []).append(token)
+            return lost
+
+    def finish(self, tokens):
+        """Forget jobs whose results were received or which were given up on."""
+        with self._lock:
+            # The announcements of these jobs were sent before their results.
+            self._drain()
+            for token in tokens:
+                self._running.pop(token, None)
+
+
+def render_batch(jobs, processes=None, chunksize=1, maxtasksperchild=None, sink=None):
+    """Draw, label, and save figure jobs in parallel on a pool of worker processes.
+
+    ROOT keeps its active pad and style in global state, which makes drawing
+    from several threads unsafe. Instead, each worker process imports ROOT
+    once, runs it in batch mode, and builds the P-TDR style once before
+    processing its share of the jobs.
+
+    A job that raises an exception is reported in its result and does not
+    interrupt the remaining jobs. A job that crashes its worker process, for
+    example through a segmentation fault in ROOT, is reported as failed as
+    well. The other jobs of its chunk are run again by a fresh worker.
+
+    Parameters
+    ----------
+    jobs : iterable of FigureJob
+        The figure jobs to run.
+    processes : int, optional
+        The number of worker processes. The default is the number of CPUs.
+    chunksize : int, optional
+        The number of jobs sent to a worker at a time. Larger chunks reduce
+        the communication overhead for many small figures. The default is 1.
+    maxtasksperchild : int, optional
+        The number of chunks a worker completes before it is replaced by a
+        fresh process, which bounds the memory held by long-lived workers. The
+        default is None for workers that live as long as the pool.
+    sink : object, optional
+        An object with an ``add(canvas, title)`` method, such as a
+        `PDFBooklet`, receiving the labelled canvas of every successful job
+        in the order of `jobs`. The canvases are pickled by the workers and
+        handed to the sink as soon as all of the preceding jobs are done, so
+        they are not all held in memory. The default is None.
+
+    Returns
+    -------
+    list of JobResult
+        The job results in the same order as `jobs`.
+    """
+    jobs = list(jobs)
+    run = _run_job if sink is None else _run_sink_job
+    results = {}
+    # The pickled canvases waiting for the preceding jobs before going to the sink.
+    payloads = {}
+    next_index = [0]
+
+    def collect(output):
+        if sink is None:
+            results[output.index] = output
+            return
+        result, payload, title = output
+        results[result.index] = result
+        payloads[result.index] = payload, title
+        while next_index[0] in payloads:
+            payload, title = payloads.pop(next_index[0])
+            if payload is not None:
+                sink.add(pickle.loads(payload), title)
+            next_index[0] += 1
+
+    def lost(index, pid):
+        result = JobResult(index, jobs[index].outputs, 'The worker process {0} died while running the job.\n'.format(pid))
+        collect(result if sink is None else (result, None, jobs[index].title))
+
+    monitor = WorkerMonitor()
+    pool = multiprocessing.Pool(processes, initializer=init_worker, initargs=(monitor.started,),
+                                maxtasksperchild=maxtasksperchild)
+    try:
+        # The chunks sent to the pool, mapped to the indices of their jobs.
+        pending = {}
+
+        def submit(indices):
+            chunk = [(index, jobs[index]) for index in indices]
+            pending[pool.apply_async(_run_chunk, (run, chunk))] = indices
+
+        for start in range(0, len(jobs), chunksize):
+            submit(list(range(start, min(start + chunksize, len(jobs)))))
+        while pending:
+            for chunk in [chunk for chunk in pending if chunk.ready()]:
+                indices = pending.pop(chunk)
+                monitor.finish(indices)
+                for output in chunk.get():
+                    collect(output)
+            for pid, started in monitor.lost().items():
+                # A worker runs the jobs of its chunk in order, so the last job it
+                # started crashed it and took the result of the whole chunk along.
+                index = started[-1]
+                chunk = next((chunk for chunk, indices in pending.items() if index in indices), None)
+                if chunk is None or chunk.ready():
+                    # The worker exited normally after sending the results of its chunk.
+                    monitor.finish(started)
+                    continue
+                indices = pending.pop(chunk)
+                monitor.finish(indices)
+                lost(index, pid)
+                remaining = [other for other in indices if other != index]
+                if remaining:
+                    submit(remaining)
+            if pending:
+                next(iter(pending)).wait(POLL_INTERVAL)
+    finally:
+        # The chunks lost with a dead worker are never marked as done, so the
+        # pool would wait for them forever when closed. Every result has been
+        # received at this point, and the idle workers are stopped instead.
+        pool.terminate()
+        pool.join()
+    return [results[index] for index in range(len(jobs))]
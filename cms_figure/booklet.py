@@ -0,0 +1,113 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Writing many figures into a single multi-page PDF file."""
+
+import ROOT
+
+from .instrument import instrument
+
+
+class PDFBooklet(object):
+    """Appends labelled canvases as the pages of one PDF file as they are drawn.
+
+    The file is kept open with ROOT's paging protocol ("file.pdf[" to open
+    and "file.pdf]" to close), so each page is written once when it is added
+    instead of saving every figure separately and merging the files
+    afterwards. Nothing is kept per page besides what ROOT needs to finish
+    the file, so thousands of pages can be written with flat memory use:
+
+        with cms_figure.PDFBooklet('control_plots.pdf') as booklet:
+            for name in names:
+                # Draw stuff here...
+                cms_figure.draw_labels('19.7 fb^{-1} (8 TeV)', pad=canvas)
+                booklet.add(canvas, title=name)
+
+    ROOT writes PDF and PostScript files through a single global stream, so
+    only one booklet can be open at a time and no other PDF or PostScript
+    files should be saved while it is open.
+
+    A booklet is also a sink for `render_batch`, which then adds the canvas
+    of every successful job as a page, in the order of the jobs.
+
+    Parameters
+    ----------
+    path : string
+        The output file path, which should end with ".pdf".
+    """
+    def __init__(self, path):
+        self.path = path
+        self.pages = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def _print(self, canvas, path, option=''):
+        """Print a canvas to the file without ROOT's message for every page."""
+        previous_level = ROOT.gErrorIgnoreLevel
+        ROOT.gErrorIgnoreLevel = max(previous_level, ROOT.kWarning)
+        try:
+            canvas.Print(path, option)
+        finally:
+            ROOT.gErrorIgnoreLevel = previous_level
+
+    @instrument('booklet_add')
+    def add(self, canvas, title=None):
+        """Append a canvas as the next page of the booklet.
+
+        Parameters
+        ----------
+        canvas : TCanvas
+            The labelled canvas.
+        title : string, optional
+            The title of the page, which is shown as its bookmark in PDF
+            viewers. The default is None for no bookmark.
+        """
+        if self.closed:
+            raise ValueError('The booklet {0} is closed'.format(self.path))
+        if not self.pages:
+            # The page size of the file is set by the canvas opening it.
+            self._print(canvas, self.path + '[')
+        self._print(canvas, self.path, 'Title:{0}'.format(title) if title else '')
+        self.pages += 1
+
+    def close(self):
+        """Finish writing the file. A booklet without pages writes no file."""
+        if self.closed:
+            return
+        self.closed = True
+        if not self.pages:
+            return
+        # Any canvas closes the file, so a tiny one is created in batch mode
+        # rather than holding on to one of the pages.
+        previous_batch = ROOT.gROOT.IsBatch()
+        ROOT.gROOT.SetBatch(True)
+        try:
+            canvas = ROOT.TCanvas('cms_figure_booklet', '', 10, 10)
+        finally:
+            ROOT.gROOT.SetBatch(previous_batch)
+        self._print(canvas, self.path + ']')
+        canvas.Close()
@@ -0,0 +1,91 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Copying the contents of PyROOT buffers, such as histogram bin arrays.
+
+Reading histogram bins or graph points one call at a time crosses into ROOT
+for every value. These helpers copy the underlying C++ arrays at once
+instead. NumPy is needed for all but `buffer_bytes`, which falls back to a
+slower copy without it.
+"""
+
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is an optional dependency.
+    np = None
+
+
+# The NumPy types of the bin contents of the histogram classes.
+HIST_ARRAY_TYPES = [
+    ('TArrayD', 'f8'),
+    ('TArrayF', 'f4'),
+    ('TArrayI', 'i4'),
+    ('TArrayS', 'i2'),
+    ('TArrayC', 'i1'),
+    ('TArrayL64', 'i8'),
+]
+
+# The array module type codes of the NumPy types, used without NumPy.
+_TYPECODES = {'f8': 'd', 'f4': 'f', 'i4': 'i', 'i2': 'h', 'i1': 'b', 'i8': 'l'}
+
+
+def hist_dtype(hist):
+    """Return the NumPy type of the bin contents of a histogram."""
+    return next(dtype for name, dtype in HIST_ARRAY_TYPES if hist.InheritsFrom(name))
+
+
+def _resize(buffer, count):
+    """Tell a PyROOT buffer its size, which it does not always know."""
+    if hasattr(buffer, 'reshape'):
+        buffer.reshape((count,))
+    elif hasattr(buffer, 'SetSize'):
+        buffer.SetSize(count)
+
+
+def as_array(buffer, dtype, count):
+    """Return a float64 NumPy array copying `count` elements of a PyROOT buffer."""
+    if count == 0:
+        return np.zeros(0, dtype=np.float64)
+    _resize(buffer, count)
+    return np.frombuffer(buffer, dtype=dtype, count=count).astype(np.float64)
+
+
+def buffer_bytes(buffer, dtype, count):
+    """Return the raw bytes of `count` elements of a PyROOT buffer, e.g. for hashing."""
+    if count == 0:
+        return b''
+    _resize(buffer, count)
+    if np is not None:
+        return np.frombuffer(buffer, dtype=dtype, count=count).tobytes()
+    packed = array(_TYPECODES[dtype], (buffer[i] for i in range(count)))
+    return packed.tobytes() if hasattr(packed, 'tobytes') else packed.tostring()
+
+
+def bin_edges(axis):
+    """Return the bin edges of a histogram axis as a NumPy array."""
+    nbins = axis.GetNbins()
+    if axis.GetXbins().GetSize():
+        return as_array(axis.GetXbins().GetArray(), 'f8', nbins + 1)
+    return np.linspace(axis.GetXmin(), axis.GetXmax(), nbins + 1)
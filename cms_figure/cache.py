@@ -0,0 +1,336 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""A content-addressed on-disk cache of figure outputs.
+
+A figure is identified by a hash of what it shows: the contents and drawing
+attributes of the objects on its pad, the effective style settings, and the
+label settings. When a campaign of figures is rerun after a small change,
+the figures whose hash is unchanged are copied from the cache instead of
+being painted and saved again.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from array import array
+
+# The label attributes that affect how the CMS and luminosity labels appear.
+LABEL_ATTRIBUTES = ('text', 'position', 'font', 'scale', 'align', 'padding_left', 'padding_right', 'padding_top')
+
+# The profile classes. TProfile2D and TProfile3D derive from TH2D and TH3D
+# rather than from TProfile.
+PROFILE_CLASSES = ('TProfile', 'TProfile2D', 'TProfile3D')
+
+
+def _update_floats(digest, values):
+    """Feed a sequence of numbers to a hash as packed doubles."""
+    packed = array('d', values)
+    digest.update(packed.tobytes() if hasattr(packed, 'tobytes') else packed.tostring())
+
+
+def _update_text(digest, *values):
+    digest.update(repr(values).encode('utf-8'))
+
+
+def _hash_attributes(digest, obj):
+    """Feed the line, fill, marker, and text attributes of a ROOT object to a hash."""
+    if obj.InheritsFrom('TAttLine'):
+        _update_text(digest, obj.GetLineColor(), obj.GetLineStyle(), obj.GetLineWidth())
+    if obj.InheritsFrom('TAttFill'):
+        _update_text(digest, obj.GetFillColor(), obj.GetFillStyle())
+    if obj.InheritsFrom('TAttMarker'):
+        _update_text(digest, obj.GetMarkerColor(), obj.GetMarkerStyle(), obj.GetMarkerSize())
+    if obj.InheritsFrom('TAttText'):
+        _update_text(digest, obj.GetTextColor(), obj.GetTextFont(), obj.GetTextSize(), obj.GetTextAlign())
+
+
+def _hash_json(digest, obj):
+    """Feed the complete state of a ROOT object, serialized with TBufferJSON, to a hash."""
+    import ROOT
+    digest.update(str(ROOT.TBufferJSON.ToJSON(obj)).encode('utf-8'))
+
+
+def hash_object(digest, obj, option=''):
+    """Feed the drawn contents and drawing attributes of a ROOT object to a hash.
+
+    Histograms, stacks, graphs, text, and pads are hashed by their contents,
+    and histograms also by their axes and their functions (e.g. fit curves).
+    Any other object, such as a legend, a line, or a function, is hashed by its
+    complete state serialized with TBufferJSON.
+
+    Parameters
+    ----------
+    digest : hashlib hash object
+        The hash to update.
+    obj : TObject
+        The object to hash.
+    option : string, optional
+        The draw option of the object. The default is an empty string.
+    """
+    # Imported here so that importing the package does not import NumPy.
+    from .buffers import buffer_bytes, hist_dtype
+    _update_text(digest, obj.ClassName(), obj.GetName(), obj.GetTitle(), str(option))
+    _hash_attributes(digest, obj)
+    if obj.InheritsFrom('TH1'):
+        for axis in (obj.GetXaxis(), obj.GetYaxis(), obj.GetZaxis()):
+            _hash_json(digest, axis)
+        ncells = obj.GetNcells()
+        if any(obj.InheritsFrom(name) for name in PROFILE_CLASSES):
+            # The bin contents and errors of profiles are derived from several arrays.
+            cells = range(ncells)
+            _update_floats(digest, [obj.GetBinContent(i) for i in cells])
+            _update_floats(digest, [obj.GetBinError(i) for i in cells])
+        else:
+            # The bin arrays are hashed at once rather than reading every cell through ROOT.
+            digest.update(buffer_bytes(obj.GetArray(), hist_dtype(obj), ncells))
+            if obj.GetSumw2N():
+                digest.update(buffer_bytes(obj.GetSumw2().GetArray(), 'f8', ncells))
+        _update_floats(digest, [obj.GetMinimum(), obj.GetMaximum()])
+        functions = obj.GetListOfFunctions()
+        for function in (functions if functions else []):
+            hash_object(digest, function)
+    elif obj.InheritsFrom('THStack'):
+        hists = obj.GetHists()
+        for hist in (hists if hists else []):
+            hash_object(digest, hist)
+    elif obj.InheritsFrom('TGraph'):
+        n = obj.GetN()
+        if obj.InheritsFrom('TGraphAsymmErrors'):
+            getters = (obj.GetX, obj.GetY, obj.GetEXlow, obj.GetEXhigh, obj.GetEYlow, obj.GetEYhigh)
+        elif obj.InheritsFrom('TGraphErrors'):
+            getters = (obj.GetX, obj.GetY, obj.GetEX, obj.GetEY)
+        else:
+            getters = (obj.GetX, obj.GetY)
+        for getter in getters:
+            digest.update(buffer_bytes(getter(), 'f8', n))
+    elif obj.InheritsFrom('TText'):
+        _update_floats(digest, [obj.GetX(), obj.GetY()])
+    elif obj.InheritsFrom('TPad'):
+        _update_floats(digest, [obj.GetTopMargin(), obj.GetRightMargin(), obj.GetBottomMargin(), obj.GetLeftMargin()])
+        _update_text(digest, obj.GetLogx(), obj.GetLogy(), obj.GetLogz(), obj.GetWw(), obj.GetWh())
+        link = obj.GetListOfPrimitives().FirstLink()
+        while link:
+            hash_object(digest, link.GetObject(), link.GetOption())
+            link = link.Next()
+    else:
+        _hash_json(digest, obj)
+
+
+def figure_key(pad=None, style=None, labels=()):
+    """Return the cache key of a figure.
+
+    Parameters
+    ----------
+    pad : TPad, optional
+        The drawn (but not necessarily painted) canvas or pad, whose primitives
+        are hashed recursively, including any labels already drawn on it.
+    style : TStyle or StyleSpec, optional
+        The effective style. A TStyle (such as a `TDRStyle`) is hashed by its
+        complete state serialized with TBufferJSON, so changes made through
+        its Set methods change the key, while a StyleSpec is hashed by its
+        settings. The default is the current gStyle.
+    labels : iterable of CMSLabel or LuminosityLabel, optional
+        Labels not yet drawn on the pad, hashed by their text, position, font,
+        scale, alignment, and padding (and those of their sublabels).
+
+    Returns
+    -------
+    string
+        The hexadecimal SHA-1 digest of the figure.
+    """
+    digest = hashlib.sha1()
+    if pad is not None:
+        hash_object(digest, pad)
+    if style is None or hasattr(style, 'InheritsFrom'):
+        # Imported here so that keys of StyleSpecs can be computed without ROOT.
+        import ROOT
+        _hash_json(digest, ROOT.gStyle if style is None else style)
+    else:
+        digest.update(json.dumps(style.settings, sort_keys=True).encode('utf-8'))
+    for label in labels:
+        for item in [label, getattr(label, 'sublabel', None)]:
+            if item is not None:
+                _update_text(digest, [getattr(item, attribute, None) for attribute in LABEL_ATTRIBUTES])
+    return digest.hexdigest()
+
+
+class FigureCache(object):
+    """A size-bounded on-disk cache of figure outputs addressed by their keys.
+
+    Each cache entry holds the output files of one figure, one per file
+    extension. When the cache grows beyond its size limit, the least recently
+    used entries are evicted. Entries are written atomically, so several
+    processes can share a cache directory.
+
+        cache = cms_figure.FigureCache('.figure_cache')
+        with cms_figure.DrawingSession() as session:
+            canvas = ROOT.TCanvas()
+            # Draw stuff here (drawing is cheap, painting and saving isn't)...
+            cms_figure.draw_labels('19.7 fb^{-1} (8 TeV)')
+            outputs = ['figure.pdf', 'figure.png']
+            key = cms_figure.figure_key(canvas, cms_figure.get_style())
+            if not cache.fetch(key, outputs):
+                session.save(canvas, *outputs)
+                cache.store(key, outputs)
+
+    Parameters
+    ----------
+    directory : string
+        The cache directory, which is created if it does not exist.
+    max_bytes : int, optional
+        The size limit of the cache. The default is 1 GiB.
+    """
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # The running size estimate of the cache, computed on the first store.
+        self._total_bytes = None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    @staticmethod
+    def _stored_name(output):
+        return 'figure' + os.path.splitext(output)[1]
+
+    def fetch(self, key, outputs):
+        """Copy the cached outputs of a figure to the given paths.
+
+        Returns
+        -------
+        bool
+            True on a cache hit, or False if any of the outputs is not cached.
+        """
+        entry = self._entry(key)
+        sources = [os.path.join(entry, self._stored_name(output)) for output in outputs]
+        if not all(os.path.isfile(source) for source in sources):
+            self.misses += 1
+            return False
+        for source, output in zip(sources, outputs):
+            shutil.copyfile(source, output)
+        # The entry's modification time records when it was last used.
+        os.utime(entry, None)
+        self.hits += 1
+        return True
+
+    def store(self, key, outputs):
+        """Add the outputs of a figure to the cache, evicting old entries if needed."""
+        entry = self._entry(key)
+        parent = os.path.dirname(entry)
+        if not os.path.isdir(parent):
+            try:
+                os.makedirs(parent)
+            except OSError:
+                if not os.path.isdir(parent):
+                    raise
+        staging = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+        try:
+            for output in outputs:
+                shutil.copyfile(output, os.path.join(staging, self._stored_name(output)))
+            if os.path.isdir(entry):
+                # Replace a stale or partial entry by renaming it away first.
+                stale = os.path.join(parent, '.stale-{0}'.format(uuid.uuid4().hex))
+                os.rename(entry, stale)
+                shutil.rmtree(stale, ignore_errors=True)
+            os.rename(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        # Other processes may share the directory, so the running size is only
+        # an estimate that triggers a full scan once it exceeds the limit.
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._entries())
+        else:
+            self._total_bytes += sum(os.path.getsize(output) for output in outputs)
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def produce(self, key, outputs, render):
+        """Fetch the outputs of a figure from the cache, or render and store them.
+
+        Parameters
+        ----------
+        key : string
+            The figure's cache key.
+        outputs : list of strings
+            The output file paths.
+        render : callable
+            Called without arguments on a cache miss to write the outputs.
+
+        Returns
+        -------
+        bool
+            True on a cache hit, otherwise False.
+        """
+        if self.fetch(key, outputs):
+            return True
+        render()
+        self.store(key, outputs)
+        return False
+
+    def _entries(self):
+        """Return the last use time, size, and path of every cache entry."""
+        entries = []
+        for prefix in os.listdir(self.directory):
+            prefix_path = os.path.join(self.directory, prefix)
+            if not os.path.isdir(prefix_path):
+                continue
+            for name in os.listdir(prefix_path):
+                if name.startswith('.'):
+                    continue
+                path = os.path.join(prefix_path, name)
+                try:
+                    size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                    entries.append((os.path.getmtime(path), size, path))
+                except OSError:
+                    # The entry was evicted by another process in the meantime.
+                    continue
+        return entries
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits its size limit."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+        self._total_bytes = total
+
+    def stats(self):
+        """Return the hit and miss counts, number of entries, and size in bytes of the cache."""
+        entries = self._entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+        }
@@ -0,0 +1,138 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Reusing styled canvases across many figures."""
+
+import contextlib
+
+import ROOT
+
+from .instrument import instrument
+from .tdr_style import get_style
+
+
+class CanvasPool(object):
+    """Hands out canvases styled by a `TDRStyle` and reuses them once returned.
+
+    Creating and closing a canvas for every figure allocates and frees a
+    canvas, its frame, and its primitives each time. A pool keeps returned
+    canvases instead, clearing them completely: every primitive is removed
+    from the canvas and those owned by it, including its subpads and the
+    label primitives drawn by this package or `DrawLatexNDC`, are deleted.
+    The canvas then takes on the pool's style again, so settings such as log
+    scales or margins changed by a figure do not leak into the next one:
+
+        pool = cms_figure.CanvasPool()
+        for name in names:
+            with pool.canvas() as canvas:
+                # Draw stuff here...
+                cms_figure.draw_labels('19.7 fb^{-1} (8 TeV)', pad=canvas)
+                canvas.SaveAs(name + '.pdf')
+
+    The pool grows whenever all of its canvases are in use and keeps at most
+    `max_idle` returned canvases, closing the rest, so it shrinks back once
+    the demand drops. Objects drawn on a canvas must be kept alive by the
+    caller until it is returned, as with any canvas. A pool must only be used
+    from one thread.
+
+    Parameters
+    ----------
+    style : TDRStyle, optional
+        The style of the canvases. The default is the base P-TDR style.
+    max_idle : int, optional
+        The number of returned canvases kept for reuse. The default is 4.
+    """
+    def __init__(self, style=None, max_idle=4):
+        self.style = style or get_style()
+        self.max_idle = max_idle
+        self._idle = []
+        self._in_use = []
+        self._created = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def __len__(self):
+        """Return the number of canvases held by the pool, in use or idle."""
+        return len(self._idle) + len(self._in_use)
+
+    @instrument('canvas_acquire')
+    def acquire(self):
+        """Return a cleared, styled canvas, which is also made the active pad.
+
+        The canvas should be handed back with `release` once it is saved.
+        """
+        if self._idle:
+            canvas = self._idle.pop()
+        else:
+            self._created += 1
+            # Canvases take their size and pad attributes from gStyle.
+            with self.style:
+                canvas = ROOT.TCanvas('cms_figure_pool_{0}'.format(self._created), '')
+        self._in_use.append(canvas)
+        canvas.cd()
+        return canvas
+
+    @instrument('canvas_release')
+    def release(self, canvas):
+        """Clear a canvas acquired from the pool and keep it for reuse.
+
+        If the pool already keeps `max_idle` canvases, the canvas is closed.
+        """
+        self._in_use = [other for other in self._in_use if other is not canvas]
+        if len(self._idle) >= self.max_idle:
+            canvas.Close()
+            return
+        # Clearing deletes the primitives owned by the canvas (kCanDelete)
+        # and only removes the others, which belong to the caller.
+        canvas.Clear()
+        with self.style:
+            canvas.UseCurrentStyle()
+            width, height = self.style.GetCanvasDefW(), self.style.GetCanvasDefH()
+        if (canvas.GetWw(), canvas.GetWh()) != (width, height):
+            canvas.SetCanvasSize(width, height)
+        canvas.SetTitle('')
+        canvas.Modified()
+        self._idle.append(canvas)
+
+    @contextlib.contextmanager
+    def canvas(self):
+        """Acquire a canvas for the duration of the context and release it on exit."""
+        canvas = self.acquire()
+        try:
+            yield canvas
+        finally:
+            self.release(canvas)
+
+    def trim(self, keep=0):
+        """Close the idle canvases beyond the given number."""
+        while len(self._idle) > keep:
+            self._idle.pop().Close()
+
+    def close(self):
+        """Close every canvas of the pool, including those still in use."""
+        self.trim()
+        while self._in_use:
+            self._in_use.pop().Close()
@@ -0,0 +1,282 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Render labelled figures straight from ROOT files for a whole campaign.
+
+A job spec lists figures, each drawn from objects in one ROOT file, and the
+label parameters and output formats they share. The figures are grouped by
+input file and the files are spread over a pool of worker processes, which
+start ROOT in batch mode with the P-TDR style once. Each worker opens a file
+once, resolves the object patterns against its key lists, reads only the
+matching objects, and saves every figure as soon as it is drawn, while the
+saved paths are printed as the files complete.
+
+The spec is a JSON file, or a YAML file if its name ends with .yaml or .yml:
+
+    {
+        "lumi_text": "35.9 fb^{-1} (13 TeV)",
+        "extra_text": "Preliminary",
+        "formats": ["pdf", "png"],
+        "output_dir": "figures",
+        "figures": [
+            {"file": "histograms.root", "objects": ["data", "signal"],
+             "draw_options": ["e", "hist"], "name": "mass"},
+            {"file": "histograms.root", "objects": ["control/h_*"],
+             "draw_options": "hist", "separate": true}
+        ]
+    }
+
+The top level "lumi_text", "cms_position", "extra_text", "formats", and
+"output_dir" are defaults that every figure may override. A figure's
+"objects" are names or fnmatch patterns (matched one directory level at a
+time), all drawn on the same canvas with one draw option per pattern, unless
+"separate" is true, in which case every matched object gets its own figure.
+Figures without a "name" are named after the stem of their file and the key
+of their (first) object, e.g. "histograms_control_h_pt". Setting "decimate"
+to true reduces huge histograms and graphs to the pixel width of the canvas
+before drawing them. Usage:
+
+    cms-figure spec.json [--processes N]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import traceback
+from collections import OrderedDict
+
+from .batch import POLL_INTERVAL, WorkerMonitor, announce_job, init_worker
+from .compat import string_types
+from .style_spec import import_yaml, is_yaml
+
+
+# The spec fields that every figure inherits unless it overrides them.
+FIGURE_DEFAULTS = {
+    'lumi_text': '',
+    'cms_position': 'left',
+    'extra_text': '',
+    'formats': ['pdf'],
+    'output_dir': '.',
+    'draw_options': '',
+    'separate': False,
+    'decimate': False,
+}
+
+
+def load_spec(path):
+    """Load a job spec from a JSON or YAML file and return its figures with the defaults filled in."""
+    with open(path) as f:
+        spec = import_yaml().safe_load(f) if is_yaml(path) else json.load(f)
+    defaults = dict(FIGURE_DEFAULTS)
+    defaults.update((field, spec[field]) for field in FIGURE_DEFAULTS if field in spec)
+    figures = []
+    for index, figure in enumerate(spec['figures']):
+        if 'file' not in figure or 'objects' not in figure:
+            raise ValueError('Figure {0} of {1} needs a "file" and "objects"'.format(index, path))
+        merged = dict(defaults)
+        merged.update(figure)
+        try:
+            _figure_options(merged)
+        except ValueError as error:
+            raise ValueError('Figure {0} of {1}: {2}'.format(index, path, error))
+        figures.append(merged)
+    _check_names(figures, path)
+    return figures
+
+
+def _check_names(figures, path):
+    """Raise a ValueError if the figures of a spec would overwrite each other's outputs.
+
+    Named figures must have distinct names within an output directory. The
+    other figures are named after their file stem and keys, so their files
+    must have distinct stems within an output directory.
+    """
+    names, stems = set(), {}
+    for figure in figures:
+        output_dir = os.path.normpath(figure['output_dir'])
+        if figure.get('name') and not figure['separate']:
+            key = output_dir, figure['name']
+            if key in names:
+                raise ValueError('Two figures of {0} are named {1} in {2}'.format(path, figure['name'], output_dir))
+            names.add(key)
+        else:
+            key = output_dir, _file_stem(figure['file'])
+            other = stems.setdefault(key, figure['file'])
+            if os.path.normpath(other) != os.path.normpath(figure['file']):
+                raise ValueError('The figures of {0} and {1} would overwrite each other in {2}'.format(
+                    other, figure['file'], output_dir))
+
+
+def _file_stem(path):
+    """Return the name of a file without its directory and extension."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _figure_name(path, key):
+    """Return a file name for the figure of an object from its file and key path."""
+    return '{0}_{1}'.format(_file_stem(path), key.replace('/', '_'))
+
+
+def _figure_options(figure):
+    """Return the object patterns of a figure and their draw options, one per pattern."""
+    patterns = figure['objects']
+    patterns = [patterns] if isinstance(patterns, string_types) else patterns
+    options = figure['draw_options']
+    options = [options] * len(patterns) if isinstance(options, string_types) else options
+    if len(options) != len(patterns):
+        raise ValueError('{0} draw options given for {1} objects'.format(len(options), len(patterns)))
+    return patterns, options
+
+
+def _expand_figure(tfile, figure):
+    """Resolve the object patterns of a figure into the objects, draw options, and names of its figures."""
+    from .rootfile import match_keys
+    patterns, options = _figure_options(figure)
+    objects, draw_options = [], []
+    for pattern, option in zip(patterns, options):
+        matches = match_keys(tfile, pattern)
+        if not matches:
+            raise KeyError('No objects matching {0} in {1}'.format(pattern, figure['file']))
+        objects.extend(matches)
+        draw_options.extend([option] * len(matches))
+    if figure['separate']:
+        return [([obj], [option], _figure_name(figure['file'], obj)) for obj, option in zip(objects, draw_options)]
+    return [(objects, draw_options, figure.get('name') or _figure_name(figure['file'], objects[0]))]
+
+
+def _render_file(task):
+    """Render the figures drawn from one ROOT file inside a worker process.
+
+    Returns a list of (outputs, error) pairs, one per figure, where error is
+    the formatted traceback of a failed figure or None.
+    """
+    index, path, figures = task
+    announce_job(index)
+    try:
+        from .rootfile import close_files, open_file, render_file_figure
+    except Exception:
+        return [([], traceback.format_exc())]
+    results = []
+    try:
+        tfile = open_file(path)
+        for figure in figures:
+            try:
+                expanded = _expand_figure(tfile, figure)
+            except Exception:
+                results.append(([], traceback.format_exc()))
+                continue
+            if not os.path.isdir(figure['output_dir']):
+                os.makedirs(figure['output_dir'])
+            for objects, draw_options, name in expanded:
+                outputs = [
+                    os.path.join(figure['output_dir'], '{0}.{1}'.format(name, extension))
+                    for extension in figure['formats']
+                ]
+                try:
+                    render_file_figure(
+                        path, objects, outputs, figure['lumi_text'],
+                        cms_position=figure['cms_position'],
+                        extra_text=figure['extra_text'],
+                        draw_options=draw_options,
+                        decimate=figure['decimate'],
+                    )
+                except Exception:
+                    results.append((outputs, traceback.format_exc()))
+                else:
+                    results.append((outputs, None))
+    except Exception:
+        results.append(([], traceback.format_exc()))
+    finally:
+        # Each file is only needed by one task, so it is not kept open.
+        close_files()
+    return results
+
+
+def render_spec(figures, processes=None):
+    """Render the figures of a job spec, yielding the (outputs, error) of each as its file completes.
+
+    If a file crashes its worker process, e.g. through a segmentation fault
+    in ROOT, a single error with empty outputs is yielded for its figures.
+
+    Parameters
+    ----------
+    figures : list of dicts
+        The figures, as returned by `load_spec`.
+    processes : int, optional
+        The number of worker processes. The default is the number of CPUs.
+    """
+    by_file = OrderedDict()
+    for figure in figures:
+        by_file.setdefault(figure['file'], []).append(figure)
+    monitor = WorkerMonitor()
+    pool = multiprocessing.Pool(processes, initializer=init_worker, initargs=(monitor.started,))
+    try:
+        # The files sent to the pool, mapped to their index and path.
+        pending = {}
+        for index, (path, file_figures) in enumerate(by_file.items()):
+            pending[pool.apply_async(_render_file, ((index, path, file_figures),))] = index, path
+        while pending:
+            for task in [task for task in pending if task.ready()]:
+                index, _ = pending.pop(task)
+                monitor.finish([index])
+                for result in task.get():
+                    yield result
+            lost = monitor.lost()
+            for task, (index, path) in list(pending.items()):
+                if task.ready():
+                    continue
+                for pid, started in lost.items():
+                    if index in started:
+                        del pending[task]
+                        monitor.finish([index])
+                        yield [], 'The worker process {0} died while rendering the figures of {1}.\n'.format(pid, path)
+            if pending:
+                next(iter(pending)).wait(POLL_INTERVAL)
+    finally:
+        # The files lost with a dead worker are never marked as done, so the
+        # pool would wait for them forever when closed.
+        pool.terminate()
+        pool.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='cms-figure', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('spec', help='the JSON or YAML job spec')
+    parser.add_argument('--processes', type=int, help='the number of worker processes (default: the number of CPUs)')
+    args = parser.parse_args(argv)
+    status = 0
+    for outputs, error in render_spec(load_spec(args.spec), args.processes):
+        if error is None:
+            sys.stdout.write('\n'.join(outputs) + '\n')
+            sys.stdout.flush()
+        else:
+            sys.stderr.write(error)
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
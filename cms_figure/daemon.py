@@ -0,0 +1,232 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""A warm plotting daemon accepting figure jobs over a Unix socket.
+
+Starting ROOT and building the P-TDR style dominates the runtime of small
+plotting scripts. The daemon pays that cost once: it starts a small pool of
+worker processes that import ROOT in batch mode and build the style, and then
+accepts figure jobs from clients over a Unix socket. Each job draws objects
+read from a ROOT file, labels the figure, and saves it (see
+`cms_figure.rootfile.render_file_figure` for the job fields).
+
+The protocol is one JSON object per line in each direction. A job request
+holds the keyword arguments of `render_file_figure`, and its response is
+{"ok": true, "outputs": [...]} or {"ok": false, "error": "<traceback>"}.
+A job that crashes its worker process fails as well. The request
+{"command": "shutdown"} stops the daemon. The socket is only accessible to
+the user running the daemon, since jobs can write to any of their files.
+
+Usage:
+
+    python -m cms_figure.daemon serve [--socket PATH] [--processes N]
+    python -m cms_figure.daemon submit job.json [--socket PATH]
+    python -m cms_figure.daemon shutdown [--socket PATH]
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import threading
+import traceback
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+from .batch import POLL_INTERVAL, WorkerMonitor, announce_job, init_worker
+
+
+# The default path of the daemon's socket, one per user.
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), 'cms_figure-{0}.sock'.format(os.getuid()))
+
+
+def _run_job(token, job):
+    """Run a figure job in a worker process and return its response."""
+    announce_job(token)
+    try:
+        from .rootfile import render_file_figure
+        return {'ok': True, 'outputs': render_file_figure(**job)}
+    except Exception:
+        return {'ok': False, 'error': traceback.format_exc()}
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    """Answers the job requests of a client connection, one JSON object per line."""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line.decode('utf-8'))
+            except ValueError:
+                response = {'ok': False, 'error': 'Invalid JSON request'}
+            else:
+                if request.get('command') == 'shutdown':
+                    self._respond({'ok': True})
+                    # shutdown waits for serve_forever, so it must not block this thread.
+                    threading.Thread(target=self.server.shutdown).start()
+                    return
+                response = self.server.run(request)
+            self._respond(response)
+
+    def _respond(self, response):
+        self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+
+class PlotDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """A Unix socket server running figure jobs on a pool of warm worker processes.
+
+    Each client connection is handled by its own thread, which waits for the
+    workers to run its jobs, so jobs from several clients run concurrently.
+
+    Parameters
+    ----------
+    socket_path : string, optional
+        The path of the Unix socket. The default is a per user socket in the
+        temporary directory.
+    processes : int, optional
+        The number of worker processes. The default is 2.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, processes=2):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.socket_path = socket_path
+        self.monitor = WorkerMonitor()
+        self.pool = multiprocessing.Pool(processes, initializer=init_worker, initargs=(self.monitor.started,))
+        self._job_ids = itertools.count()
+        self._crashed = False
+        socketserver.UnixStreamServer.__init__(self, socket_path, _JobHandler)
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        # Restrict the socket to the owner before it starts listening.
+        os.chmod(self.socket_path, 0o600)
+
+    def run(self, request):
+        """Run a job on a worker process and return its response.
+
+        If the worker dies while running the job, a failed response is
+        returned instead of waiting for the job forever.
+        """
+        token = next(self._job_ids)
+        result = self.pool.apply_async(_run_job, (token, request))
+        while True:
+            result.wait(POLL_INTERVAL)
+            if result.ready():
+                break
+            for pid, started in self.monitor.lost().items():
+                if token in started:
+                    self.monitor.finish([token])
+                    self._crashed = True
+                    return {'ok': False, 'error': 'The worker process {0} died while running the job.\n'.format(pid)}
+        self.monitor.finish([token])
+        return result.get()
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        if self._crashed:
+            # The pool would wait forever for the jobs lost with a dead worker.
+            self.pool.terminate()
+        else:
+            self.pool.close()
+        self.pool.join()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def submit(jobs, socket_path=DEFAULT_SOCKET):
+    """Send figure jobs to a running daemon and return their responses.
+
+    Parameters
+    ----------
+    jobs : list of dicts
+        The jobs, each holding the keyword arguments of `render_file_figure`.
+    socket_path : string, optional
+        The path of the daemon's socket.
+
+    Returns
+    -------
+    list of dicts
+        The responses, in the same order as the jobs.
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(socket_path)
+    try:
+        stream = client.makefile('rwb')
+        responses = []
+        for job in jobs:
+            stream.write((json.dumps(job) + '\n').encode('utf-8'))
+            stream.flush()
+            responses.append(json.loads(stream.readline().decode('utf-8')))
+        return responses
+    finally:
+        client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['serve', 'submit', 'shutdown'])
+    parser.add_argument('jobs', nargs='?', help='a JSON file holding a job or a list of jobs (for submit)')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='the path of the Unix socket')
+    parser.add_argument('--processes', type=int, default=2, help='the number of worker processes (for serve)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        server = PlotDaemon(args.socket, args.processes)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return 0
+    if args.command == 'shutdown':
+        submit([{'command': 'shutdown'}], args.socket)
+        return 0
+    if not args.jobs:
+        parser.error('submit requires a job file')
+    with open(args.jobs) as f:
+        jobs = json.load(f)
+    jobs = [jobs] if isinstance(jobs, dict) else jobs
+    status = 0
+    for response in submit(jobs, args.socket):
+        if response['ok']:
+            sys.stdout.write('\n'.join(response['outputs']) + '\n')
+        else:
+            sys.stderr.write(response['error'])
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Reducing huge histograms and graphs to the resolution of the pad.
+
+A graph with millions of points or a histogram with a hundred thousand bins
+drawn on a 600x600 canvas covers only a few hundred pixel columns, yet every
+point is painted and written to vector outputs. The functions here extract
+the points as NumPy arrays and return reduced copies to draw instead:
+
+    hist = cms_figure.decimate(fine_hist, canvas)
+    hist.Draw('hist')
+    graph = cms_figure.decimate(dense_graph, canvas)
+    graph.Draw('l')
+    cms_figure.draw_labels('19.7 fb^{-1} (8 TeV)', pad=canvas)
+
+Graphs keep the lowest and highest point of every pixel column, so their
+envelope looks the same, and histograms are rebinned by averaging groups of
+adjacent bins, which keeps the height of the distribution and propagates
+the errors. This module requires NumPy.
+"""
+
+import numpy as np
+
+import ROOT
+
+from .buffers import as_array, bin_edges, hist_dtype
+from .instrument import instrument
+
+
+# The status bits of an axis that change how it is drawn.
+AXIS_BITS = (
+    'kDecimals', 'kTickPlus', 'kTickMinus', 'kCenterTitle', 'kCenterLabels', 'kRotateTitle',
+    'kNoExponent', 'kMoreLogLabels',
+)
+
+def pixel_columns(pad=None):
+    """Return the width in pixels of the frame of a pad, by default the active pad."""
+    pad = pad or ROOT.gPad
+    frame_width = 1 - pad.GetLeftMargin() - pad.GetRightMargin()
+    return max(1, int(pad.GetWw() * pad.GetAbsWNDC() * frame_width))
+
+
+def _copy_axis(source, target):
+    """Copy the title, drawing attributes, and user range of an axis to the axis of a reduced copy."""
+    ROOT.TAttAxis.Copy(source, target)
+    target.SetTitle(source.GetTitle())
+    for name in AXIS_BITS:
+        bit = getattr(ROOT.TAxis, name)
+        target.SetBit(bit, source.TestBit(bit))
+    target.SetTimeDisplay(source.GetTimeDisplay())
+    target.SetTimeFormat(source.GetTimeFormat())
+    if source.TestBit(ROOT.TAxis.kAxisRange):
+        # The reduced copy has other bins, so the range is set by its edges.
+        target.SetRangeUser(source.GetBinLowEdge(source.GetFirst()), source.GetBinUpEdge(source.GetLast()))
+
+
+def _copy_attributes(source, target):
+    """Copy the name, title, axes, stored extremes, and drawing attributes of an object to its reduced copy.
+
+    The reduced copy is then drawn with the same frame as the object.
+    """
+    target.SetName('{0}_decimated'.format(source.GetName()))
+    target.SetTitle(source.GetTitle())
+    for attributes in (ROOT.TAttLine, ROOT.TAttFill, ROOT.TAttMarker):
+        attributes.Copy(source, target)
+    _copy_axis(source.GetXaxis(), target.GetXaxis())
+    _copy_axis(source.GetYaxis(), target.GetYaxis())
+    # The unset extremes (-1111) are copied as well, leaving them unset.
+    if source.InheritsFrom('TH1'):
+        target.SetMinimum(source.GetMinimumStored())
+        target.SetMaximum(source.GetMaximumStored())
+    else:
+        target.SetMinimum(source.GetMinimum())
+        target.SetMaximum(source.GetMaximum())
+
+
+@instrument('decimate_graph')
+def decimate_graph(graph, columns):
+    """Return a copy of a graph keeping the extreme points of every pixel column.
+
+    The x range of the points is split into `columns` equal columns, and the
+    points with the lowest and highest y value in each column are kept in
+    their original order, along with their errors for graphs with symmetric
+    or asymmetric errors. Other graph classes are reduced to plain graphs.
+    Graphs with no more than two points per column are returned as they are.
+
+    Parameters
+    ----------
+    graph : TGraph, TGraphErrors, or TGraphAsymmErrors
+        The graph to reduce.
+    columns : int
+        The number of pixel columns, see `pixel_columns`.
+    """
+    n = graph.GetN()
+    if n <= 2 * columns:
+        return graph
+    x = as_array(graph.GetX(), 'f8', n)
+    y = as_array(graph.GetY(), 'f8', n)
+    x_min, x_max = x.min(), x.max()
+    column = ((x - x_min) * (columns / max(x_max - x_min, 1e-300))).astype(np.int64)
+    np.clip(column, 0, columns - 1, out=column)
+    # Sorting by column and then by y puts the lowest and highest point of a
+    # column at the start and the end of its run.
+    order = np.lexsort((y, column))
+    starts = np.flatnonzero(np.diff(column[order], prepend=-1))
+    ends = np.append(starts[1:], n) - 1
+    keep = np.unique(np.concatenate((order[starts], order[ends])))
+    if graph.InheritsFrom('TGraphAsymmErrors'):
+        errors = [
+            as_array(getter(), 'f8', n)[keep]
+            for getter in (graph.GetEXlow, graph.GetEXhigh, graph.GetEYlow, graph.GetEYhigh)
+        ]
+        reduced = ROOT.TGraphAsymmErrors(keep.size, x[keep], y[keep], *errors)
+    elif graph.InheritsFrom('TGraphErrors'):
+        errors = [as_array(getter(), 'f8', n)[keep] for getter in (graph.GetEX, graph.GetEY)]
+        reduced = ROOT.TGraphErrors(keep.size, x[keep], y[keep], *errors)
+    else:
+        reduced = ROOT.TGraph(keep.size, x[keep], y[keep])
+    _copy_attributes(graph, reduced)
+    return reduced
+
+
+@instrument('rebin_hist')
+def rebin_hist(hist, columns):
+    """Return a copy of a 1D histogram with its bins averaged in groups to fit the pixel columns.
+
+    Groups of adjacent bins are merged so that there are at most `columns`
+    bins, with a smaller last group if the bins don't divide evenly. The
+    content of a merged bin is the mean content of its group and its error
+    is the error of that mean, so the drawn shape keeps its height. The
+    underflow and overflow bins are kept as they are. Histograms that
+    already fit, and profiles, are returned as they are.
+
+    Parameters
+    ----------
+    hist : TH1
+        The one dimensional histogram to reduce.
+    columns : int
+        The number of pixel columns, see `pixel_columns`.
+    """
+    axis = hist.GetXaxis()
+    nbins = axis.GetNbins()
+    if nbins <= columns or hist.InheritsFrom('TProfile'):
+        return hist
+    group = -(-nbins // columns)
+    edges = bin_edges(axis)
+    contents = as_array(hist.GetArray(), hist_dtype(hist), nbins + 2)
+    if hist.GetSumw2N():
+        sumw2 = as_array(hist.GetSumw2().GetArray(), 'f8', nbins + 2)
+    else:
+        sumw2 = np.abs(contents)
+    starts = np.arange(0, nbins, group)
+    counts = np.diff(np.append(starts, nbins))
+    means = np.add.reduceat(contents[1:-1], starts) / counts
+    errors = np.sqrt(np.add.reduceat(sumw2[1:-1], starts)) / counts
+    reduced_edges = np.append(edges[starts], edges[-1])
+    reduced = ROOT.TH1D('{0}_decimated'.format(hist.GetName()), '', starts.size, reduced_edges)
+    reduced.SetDirectory(0)
+    reduced.Sumw2()
+    for index in range(starts.size):
+        reduced.SetBinContent(index + 1, means[index])
+        reduced.SetBinError(index + 1, errors[index])
+    for index in (0, -1):
+        bin_index = 0 if index == 0 else starts.size + 1
+        reduced.SetBinContent(bin_index, contents[index])
+        reduced.SetBinError(bin_index, np.sqrt(sumw2[index]))
+    reduced.SetEntries(hist.GetEntries())
+    _copy_attributes(hist, reduced)
+    return reduced
+
+
+def decimate(obj, pad=None):
+    """Return a copy of a histogram or graph reduced to the pixel width of a pad.
+
+    One dimensional histograms are rebinned with `rebin_hist` and graphs are
+    decimated with `decimate_graph`. Any other object, or one that already
+    fits, is returned as it is, so every object can be passed through before
+    it is drawn. The reduced copy must be kept alive until the pad is saved.
+
+    Parameters
+    ----------
+    obj : TObject
+        The object about to be drawn.
+    pad : TPad, optional
+        The pad it will be drawn on. The default is the active pad.
+    """
+    columns = pixel_columns(pad)
+    if obj.InheritsFrom('TH1') and obj.GetDimension() == 1:
+        return rebin_hist(obj, columns)
+    if obj.InheritsFrom('TGraph'):
+        return decimate_graph(obj, columns)
+    return obj
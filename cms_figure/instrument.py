@@ -0,0 +1,136 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Opt-in instrumentation of the drawing operations.
+
+The operations of the labels, styles, and utilities that cross into ROOT
+record their call counts and cumulative wall time while instrumentation is
+enabled. When it is disabled, an instrumented call costs one extra Python
+function call and a flag check, so the hooks can stay in production code.
+
+Instrumentation is enabled with `enable_stats`, the `collect_stats` context
+manager, or by setting the CMS_FIGURE_STATS environment variable to a
+non-empty value before importing the package.
+"""
+
+import contextlib
+import functools
+import os
+import threading
+import time
+
+
+# The clock used to time the operations.
+_clock = getattr(time, 'perf_counter', time.time)
+
+# Whether the operations are currently being recorded.
+_enabled = bool(os.environ.get('CMS_FIGURE_STATS'))
+
+# The call count and cumulative wall time in seconds, keyed by operation name.
+_stats = {}
+
+# Guards the statistics against operations recorded from several threads.
+_stats_lock = threading.Lock()
+
+
+def enable_stats():
+    """Start recording the instrumented operations."""
+    global _enabled
+    _enabled = True
+
+
+def disable_stats():
+    """Stop recording the instrumented operations."""
+    global _enabled
+    _enabled = False
+
+
+def reset_stats():
+    """Discard the recorded statistics."""
+    _stats.clear()
+
+
+def stats():
+    """Return the recorded statistics of the instrumented operations.
+
+    Returns
+    -------
+    dict
+        The call count ("calls") and cumulative wall time in seconds
+        ("seconds") keyed by operation name.
+    """
+    return {operation: {'calls': calls, 'seconds': seconds} for operation, (calls, seconds) in _stats.items()}
+
+
+@contextlib.contextmanager
+def collect_stats(reset=True):
+    """Record the instrumented operations inside of the context.
+
+    The previous instrumentation state is restored on exit. The statistics
+    are available from `stats` both inside and after the context:
+
+        with cms_figure.collect_stats():
+            cms_figure.draw_labels('19.7 fb^{-1} (8 TeV)')
+        print(cms_figure.stats())
+
+    Parameters
+    ----------
+    reset : bool, optional
+        Whether to discard the previously recorded statistics on entry.
+        The default is True.
+    """
+    global _enabled
+    previous = _enabled
+    if reset:
+        reset_stats()
+    _enabled = True
+    try:
+        yield
+    finally:
+        _enabled = previous
+
+
+def record(operation, seconds):
+    """Add a call and its wall time in seconds to the statistics of an operation."""
+    with _stats_lock:
+        entry = _stats.get(operation)
+        if entry is None:
+            _stats[operation] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+
+def instrument(operation):
+    """Decorate a function to record its calls under the given operation name."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            start = _clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(operation, _clock() - start)
+        return wrapper
+    return decorator
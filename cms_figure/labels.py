@@ -22,13 +22,12 @@
 
 import ROOT
 
-
-class LabelTextAlignmentError(Exception):
-    pass
-
-
-class LabelPositionError(Exception):
-    pass
+from .instrument import instrument
+from .layout import (
+    CMS_LABEL_DEFAULTS, CMS_SUBLABEL_DEFAULTS, LUMI_LABEL_DEFAULTS,
+    LabelPositionError, LabelTextAlignmentError, TEXT_ALIGNMENT,
+    alignment_code, cms_label_layout, luminosity_label_layout,
+)
 
 
 class LabelBase(ROOT.TLatex):
@@ -36,17 +35,7 @@ class LabelBase(ROOT.TLatex):
 
     # Tuples of horizontal and vertical text alignment names and
     # their corresponding ROOT text alignment integer values.
-    TEXT_ALIGNMENT = {
-        ('left', 'bottom'): 11,
-        ('left', 'center'): 12,
-        ('left', 'top'): 13,
-        ('center', 'bottom'): 21,
-        ('center', 'center'): 22,
-        ('center', 'top'): 23,
-        ('right', 'bottom'): 31,
-        ('right', 'center'): 32,
-        ('right', 'top'): 33,
-    }
+    TEXT_ALIGNMENT = TEXT_ALIGNMENT
 
     def __init__(self):
         super(LabelBase, self).__init__()
@@ -57,12 +46,7 @@ class LabelBase(ROOT.TLatex):
 
     @align.setter
     def align(self, value):
-        if value in self.TEXT_ALIGNMENT:
-            self.SetTextAlign(self.TEXT_ALIGNMENT[value])
-        elif value in self.TEXT_ALIGNMENT.values():
-            self.SetTextAlign(value)
-        else:
-            raise LabelTextAlignmentError('Unrecognized value: {0!s}'.format(value))
+        self.SetTextAlign(alignment_code(value))
 
     @property
     def font(self):
@@ -81,12 +65,40 @@ class LabelBase(ROOT.TLatex):
         self.SetTextSize(value)
 
     @staticmethod
-    def get_canvas_margins():
-        """Return the top, right, bottom, and left margins of the active canvas.
+    @instrument('get_canvas_margins')
+    def get_canvas_margins(pad=None):
+        """Return the top, right, bottom, and left margins of a pad.
 
-        Figure labels are often oriented relative to these margins.
+        Figure labels are often oriented relative to these margins. The
+        default pad is the active canvas.
         """
-        return ROOT.gPad.GetTopMargin(), ROOT.gPad.GetRightMargin(), ROOT.gPad.GetBottomMargin(), ROOT.gPad.GetLeftMargin()
+        pad = pad or ROOT.gPad
+        return pad.GetTopMargin(), pad.GetRightMargin(), pad.GetBottomMargin(), pad.GetLeftMargin()
+
+    @instrument('draw_placement')
+    def draw_placement(self, placement, text, pad=None):
+        """Draw the text on a pad according to a precomputed placement.
+
+        Like `DrawLatexNDC`, a copy of the label is added to the pad's
+        primitives, which the pad deletes when it is cleared or deleted.
+        Unlike it, the pad is given explicitly rather than taken from gPad,
+        so labels can be drawn on pads that are not active (for example,
+        from several threads). The default pad is the active canvas.
+
+        Returns the TLatex primitive added to the pad.
+        """
+        pad = pad or ROOT.gPad
+        self.SetTextSize(placement.size)
+        self.SetTextAlign(placement.align)
+        latex = ROOT.TLatex(placement.x, placement.y, text)
+        ROOT.TAttText.Copy(self, latex)
+        ROOT.TAttLine.Copy(self, latex)
+        latex.SetNDC()
+        latex.SetBit(ROOT.kCanDelete)
+        ROOT.SetOwnership(latex, False)
+        pad.GetListOfPrimitives().Add(latex)
+        pad.Modified()
+        return latex
 
 
 class CMSLabel(LabelBase):
@@ -146,96 +158,61 @@ class CMSLabel(LabelBase):
     """
     def __init__(self):
         super(CMSLabel, self).__init__()
-        self.text = 'CMS'
-        self.position = 'left'
-        self.font = 61
-        self.scale = 0.75
-        self.padding_left = 0.045
-        self.padding_right = 0.045
-        self.padding_top = None
+        self.text = CMS_LABEL_DEFAULTS['text']
+        self.position = CMS_LABEL_DEFAULTS['position']
+        self.font = CMS_LABEL_DEFAULTS['font']
+        self.scale = CMS_LABEL_DEFAULTS['scale']
+        self.padding_left = CMS_LABEL_DEFAULTS['padding_left']
+        self.padding_right = CMS_LABEL_DEFAULTS['padding_right']
+        self.padding_top = CMS_LABEL_DEFAULTS['padding_top']
         self.sublabel = LabelBase()
-        self.sublabel.text = ''
-        self.sublabel.font = 52
-        self.sublabel.scale = 0.76
-        self.sublabel.padding_left = 0.12
-        self.sublabel.padding_top = 1.2
-
-    def draw(self):
-        """Draw the CMS label and sublabel on the active canvas."""
-        # Draw the label.
-        if self.position == 'left':
-            label_coordinates = self._draw_label_left()
-        elif self.position == 'center':
-            label_coordinates = self._draw_label_center()
-        elif self.position == 'right':
-            label_coordinates = self._draw_label_right()
-        elif self.position == 'outside':
-            label_coordinates = self._draw_label_outside()
-        else:
-            raise LabelPositionError('Unrecognized value: {0}'.format(self.position))
-        # Draw the sublabel.
-        if self.sublabel.text:
-            if self.position == 'outside':
-                self._draw_sublabel_outside(*label_coordinates)
-            else:
-                self._draw_sublabel_inside(*label_coordinates)
-
-    def _draw_label_left(self):
-        """Draw the label on the top left corner inside the frame and return its coordinates."""
-        top_margin, right_margin, bottom_margin, left_margin = self.get_canvas_margins()
-        self.size = self.scale * top_margin
-        self.align = ('left', 'top')
-        x = left_margin + self.padding_left * (1 - left_margin - right_margin)
-        y = 1 - top_margin - (self.padding_top or 0.035) * (1 - top_margin - bottom_margin)
-        self.DrawLatexNDC(x, y, self.text)
-        return x, y
-
-    def _draw_label_center(self):
-        """Draw the label on the top center inside the frame and return its coordinates."""
-        top_margin, right_margin, bottom_margin, left_margin = self.get_canvas_margins()
-        self.size = self.scale * top_margin
-        self.align = ('center', 'top')
-        x = left_margin + 0.5 * (1 - left_margin - right_margin)
-        y = 1 - top_margin - (self.padding_top or 0.035) * (1 - top_margin - bottom_margin)
-        self.DrawLatexNDC(x, y, self.text)
-        return x, y
-
-    def _draw_label_right(self):
-        """Draw the label on the top right corner inside the frame and return its coordinates."""
-        top_margin, right_margin, bottom_margin, left_margin = self.get_canvas_margins()
-        self.size = self.scale * top_margin
-        self.align = ('right', 'top')
-        x = 1 - right_margin - self.padding_right * (1 - left_margin - right_margin)
-        y = 1 - top_margin - (self.padding_top or 0.035) * (1 - top_margin - bottom_margin)
-        self.DrawLatexNDC(x, y, self.text)
-        return x, y
-
-    def _draw_label_outside(self):
-        """Draw the label on the top left corner outside the frame and return its coordinates."""
-        top_margin, _, _, left_margin = self.get_canvas_margins()
-        self.size = self.scale * top_margin
-        self.align = ('left', 'bottom')
-        x = left_margin
-        y = 1 - (self.padding_top or 0.8) * top_margin
-        self.DrawLatexNDC(x, y, self.text)
-        return x, y
-
-    def _draw_sublabel_inside(self, x_label, y_label):
-        """Draw the sublabel below the label inside the frame."""
-        self.sublabel.size = self.sublabel.scale * self.size
-        self.sublabel.align = self.align
-        x_sublabel = x_label
-        y_sublabel = y_label - self.sublabel.padding_top * self.size
-        self.sublabel.DrawLatexNDC(x_sublabel, y_sublabel, self.sublabel.text)
-
-    def _draw_sublabel_outside(self, x_label, y_label):
-        """Draw the sublabel to the right of the label outside the frame."""
-        _, right_margin, _, left_margin = self.get_canvas_margins()
-        self.sublabel.size = self.sublabel.scale * self.size
-        self.sublabel.align = self.align
-        x_sublabel = left_margin + self.sublabel.padding_left * (1 - left_margin - right_margin)
-        y_sublabel = y_label
-        self.sublabel.DrawLatexNDC(x_sublabel, y_sublabel, self.sublabel.text)
+        self.sublabel.text = CMS_SUBLABEL_DEFAULTS['text']
+        self.sublabel.font = CMS_SUBLABEL_DEFAULTS['font']
+        self.sublabel.scale = CMS_SUBLABEL_DEFAULTS['scale']
+        self.sublabel.padding_left = CMS_SUBLABEL_DEFAULTS['padding_left']
+        self.sublabel.padding_top = CMS_SUBLABEL_DEFAULTS['padding_top']
+
+    def layout(self, margins=None, scale_factor=1.0, pad=None):
+        """Return the placements of the label and sublabel.
+
+        Parameters
+        ----------
+        margins : 4-tuple of floats, optional
+            The top, right, bottom, and left canvas margins. The default is
+            the margins of `pad`.
+        scale_factor : float, optional
+            A factor applied to the text size scale, e.g. to compensate for the
+            height of a pad in a divided canvas. The default is 1.0.
+        pad : TPad, optional
+            The pad whose margins are used if none are given. The default is
+            the active canvas.
+
+        Returns
+        -------
+        2-tuple of Placement
+            The placements of the label and the sublabel. The sublabel
+            placement is None if the sublabel has no text.
+        """
+        return cms_label_layout(
+            margins or self.get_canvas_margins(pad),
+            position=self.position,
+            scale=self.scale * scale_factor,
+            padding_left=self.padding_left,
+            padding_right=self.padding_right,
+            padding_top=self.padding_top,
+            sublabel=bool(self.sublabel.text),
+            sublabel_scale=self.sublabel.scale,
+            sublabel_padding_left=self.sublabel.padding_left,
+            sublabel_padding_top=self.sublabel.padding_top,
+        )
+
+    @instrument('cms_label_draw')
+    def draw(self, pad=None):
+        """Draw the CMS label and sublabel on a pad, by default the active canvas."""
+        label_placement, sublabel_placement = self.layout(pad=pad)
+        self.draw_placement(label_placement, self.text, pad)
+        if sublabel_placement is not None:
+            self.sublabel.draw_placement(sublabel_placement, self.sublabel.text, pad)
 
 
 class LuminosityLabel(LabelBase):
@@ -269,16 +246,35 @@ class LuminosityLabel(LabelBase):
     def __init__(self, text):
         super(LuminosityLabel, self).__init__()
         self.text = text
-        self.font = 42
-        self.scale = 0.6
-        self.align = 31
-        self.padding_top = 0.8
-
-    def draw(self):
-        """Draw the luminosity label on the active canvas."""
-        top_margin, right_margin, _, _ = self.get_canvas_margins()
-        self.size = self.scale * top_margin
-        x = 1 - right_margin
-        y = 1 - self.padding_top * top_margin
-        self.DrawLatexNDC(x, y, self.text)
+        self.font = LUMI_LABEL_DEFAULTS['font']
+        self.scale = LUMI_LABEL_DEFAULTS['scale']
+        self.align = LUMI_LABEL_DEFAULTS['align']
+        self.padding_top = LUMI_LABEL_DEFAULTS['padding_top']
+
+    def layout(self, margins=None, scale_factor=1.0, pad=None):
+        """Return the placement of the label.
+
+        Parameters
+        ----------
+        margins : 4-tuple of floats, optional
+            The top, right, bottom, and left canvas margins. The default is
+            the margins of `pad`.
+        scale_factor : float, optional
+            A factor applied to the text size scale, e.g. to compensate for the
+            height of a pad in a divided canvas. The default is 1.0.
+        pad : TPad, optional
+            The pad whose margins are used if none are given. The default is
+            the active canvas.
+        """
+        return luminosity_label_layout(
+            margins or self.get_canvas_margins(pad),
+            scale=self.scale * scale_factor,
+            align=self.align,
+            padding_top=self.padding_top,
+        )
+
+    @instrument('lumi_label_draw')
+    def draw(self, pad=None):
+        """Draw the luminosity label on a pad, by default the active canvas."""
+        self.draw_placement(self.layout(pad=pad), self.text, pad)
 
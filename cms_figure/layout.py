@@ -0,0 +1,219 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Pure Python layout of the CMS figure labels.
+
+The functions in this module compute where the labels are drawn from the
+margins of a canvas and the label settings, without touching ROOT. Their
+results are memoized on those inputs, so every canvas with the same margins
+and label settings reuses the same layout.
+"""
+
+from collections import namedtuple
+
+
+class LabelTextAlignmentError(Exception):
+    pass
+
+
+class LabelPositionError(Exception):
+    pass
+
+
+# Tuples of horizontal and vertical text alignment names and
+# their corresponding ROOT text alignment integer values.
+TEXT_ALIGNMENT = {
+    ('left', 'bottom'): 11,
+    ('left', 'center'): 12,
+    ('left', 'top'): 13,
+    ('center', 'bottom'): 21,
+    ('center', 'center'): 22,
+    ('center', 'top'): 23,
+    ('right', 'bottom'): 31,
+    ('right', 'center'): 32,
+    ('right', 'top'): 33,
+}
+
+
+# The CMS Publication Committee defaults of the label settings, which are
+# shared by the ROOT labels and the matplotlib backend.
+CMS_LABEL_DEFAULTS = {
+    'text': 'CMS',
+    'position': 'left',
+    'font': 61, # Helvetica Bold
+    'scale': 0.75,
+    'padding_left': 0.045,
+    'padding_right': 0.045,
+    'padding_top': None,
+}
+CMS_SUBLABEL_DEFAULTS = {
+    'text': '',
+    'font': 52, # Helvetica Italic
+    'scale': 0.76,
+    'padding_left': 0.12,
+    'padding_top': 1.2,
+}
+LUMI_LABEL_DEFAULTS = {
+    'font': 42, # Helvetica
+    'scale': 0.6,
+    'align': 31,
+    'padding_top': 0.8,
+}
+
+
+class Placement(namedtuple('Placement', ['x', 'y', 'size', 'align'])):
+    """The drawing coordinates, text size, and text alignment code of a label.
+
+    The coordinates are in normalized device coordinates (NDC) of the canvas.
+    """
+    __slots__ = ()
+
+
+def alignment_code(value):
+    """Return the ROOT text alignment code for an alignment name tuple or code."""
+    if value in TEXT_ALIGNMENT:
+        return TEXT_ALIGNMENT[value]
+    elif value in TEXT_ALIGNMENT.values():
+        return value
+    raise LabelTextAlignmentError('Unrecognized value: {0!s}'.format(value))
+
+
+def memoize(function):
+    """Cache the results of a function on its (hashable) arguments.
+
+    The cache is cleared once it holds `memoize.maxsize` results, which keeps
+    it bounded when the inputs never repeat.
+    """
+    cache = {}
+
+    def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        if len(cache) >= memoize.maxsize:
+            cache.clear()
+        result = cache[key] = function(*args, **kwargs)
+        return result
+
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+    wrapper.cache = cache
+    wrapper.cache_clear = cache.clear
+    return wrapper
+
+memoize.maxsize = 1024
+
+
+@memoize
+def cms_label_layout(margins, position='left', scale=0.75, padding_left=0.045, padding_right=0.045,
+                     padding_top=None, sublabel=False, sublabel_scale=0.76, sublabel_padding_left=0.12,
+                     sublabel_padding_top=1.2):
+    """Return the placements of the CMS label and its sublabel.
+
+    The arguments mirror the attributes of `CMSLabel` and its sublabel, which
+    document their meaning.
+
+    Parameters
+    ----------
+    margins : 4-tuple of floats
+        The top, right, bottom, and left margins of the canvas.
+    sublabel : bool, optional
+        Whether the label has a sublabel. The default is False.
+
+    Returns
+    -------
+    2-tuple of Placement
+        The placements of the label and the sublabel. The sublabel placement
+        is None if the label has no sublabel.
+    """
+    top_margin, right_margin, bottom_margin, left_margin = margins
+    size = scale * top_margin
+    frame_width = 1 - left_margin - right_margin
+    frame_height = 1 - top_margin - bottom_margin
+    if position == 'left':
+        align = TEXT_ALIGNMENT[('left', 'top')]
+        x = left_margin + padding_left * frame_width
+        y = 1 - top_margin - (padding_top or 0.035) * frame_height
+    elif position == 'center':
+        align = TEXT_ALIGNMENT[('center', 'top')]
+        x = left_margin + 0.5 * frame_width
+        y = 1 - top_margin - (padding_top or 0.035) * frame_height
+    elif position == 'right':
+        align = TEXT_ALIGNMENT[('right', 'top')]
+        x = 1 - right_margin - padding_right * frame_width
+        y = 1 - top_margin - (padding_top or 0.035) * frame_height
+    elif position == 'outside':
+        align = TEXT_ALIGNMENT[('left', 'bottom')]
+        x = left_margin
+        y = 1 - (padding_top or 0.8) * top_margin
+    else:
+        raise LabelPositionError('Unrecognized value: {0}'.format(position))
+    label = Placement(x, y, size, align)
+    if not sublabel:
+        return label, None
+    # The sublabel sits to the right of the label outside the frame
+    # and below the label inside the frame.
+    if position == 'outside':
+        x_sublabel = left_margin + sublabel_padding_left * frame_width
+        y_sublabel = y
+    else:
+        x_sublabel = x
+        y_sublabel = y - sublabel_padding_top * size
+    return label, Placement(x_sublabel, y_sublabel, sublabel_scale * size, align)
+
+
+@memoize
+def luminosity_label_layout(margins, scale=0.6, align=31, padding_top=0.8):
+    """Return the placement of the luminosity label.
+
+    The arguments mirror the attributes of `LuminosityLabel`, which document
+    their meaning.
+
+    Parameters
+    ----------
+    margins : 4-tuple of floats
+        The top, right, bottom, and left margins of the canvas.
+    """
+    top_margin, right_margin, _, _ = margins
+    return Placement(1 - right_margin, 1 - padding_top * top_margin, scale * top_margin, alignment_code(align))
+
+
+class Box(namedtuple('Box', ['x1', 'y1', 'x2', 'y2'])):
+    """A rectangle in normalized device coordinates (NDC) of the canvas.
+
+    (x1, y1) is the bottom left corner and (x2, y2) is the top right corner.
+    """
+    __slots__ = ()
+
+    def overlaps(self, other):
+        """Return whether this box and another box overlap."""
+        return self.x1 < other.x2 and other.x1 < self.x2 and self.y1 < other.y2 and other.y1 < self.y2
+
+
+def text_box(placement, width, height):
+    """Return the box covered by text of a given width and height drawn at a placement."""
+    horizontal, vertical = divmod(placement.align, 10)
+    x1 = placement.x - width * 0.5 * (horizontal - 1)
+    y1 = placement.y - height * 0.5 * (vertical - 1)
+    return Box(x1, y1, x1 + width, y1 + height)
@@ -0,0 +1,341 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Luminosity label text built from luminosity CSV exports.
+
+The luminosity tool (brilcalc) exports the delivered and recorded luminosity
+per run, or per lumisection with the --byls option, as CSV files that often
+have millions of rows. The files are streamed in chunks parsed by NumPy, the
+rows are filtered by a certified run and lumisection JSON, and the recorded
+luminosity is summed per data taking period and center-of-mass energy. The
+totals are cached on disk keyed on the files' paths, sizes, and modification
+times, so repeated plotting jobs do not parse the files again. This module
+requires NumPy.
+"""
+
+import hashlib
+import io
+import itertools
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from .compat import string_types
+
+
+# The directory of the on-disk cache of luminosity totals.
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'cms_figure', 'lumi',
+)
+
+# The number of inverse barns in the units of the exported luminosity columns.
+UNITS = {'/b': 1.0, '/mb': 1e3, '/ub': 1e6, '/nb': 1e9, '/pb': 1e12, '/fb': 1e15}
+
+# The totals computed in this process, keyed by their cache keys.
+_totals_cache = {}
+
+
+class LumiFormatError(Exception):
+    pass
+
+
+def _columns(header, row):
+    """Map the column names of a CSV export to their indices once colons are turned into commas.
+
+    Some columns hold colon separated values (e.g. "run:fill" or a time of day),
+    so the indices are derived from the first data row.
+    """
+    names = header.lstrip('#').strip().split(',')
+    fields = row.strip().split(',')
+    if len(names) != len(fields):
+        raise LumiFormatError('The header and first row have different lengths: {0!r}'.format(header))
+    columns, index = {}, 0
+    for name, field in zip(names, fields):
+        # "run:fill" and "ls" (lumisection:CMS lumisection) hold two numbers.
+        columns[name.partition(':')[0].partition('(')[0]] = (index, name)
+        index += field.count(':') + 1
+    return columns
+
+
+def iter_lumi_csv(path, chunk_rows=1000000):
+    """Read the run numbers, lumisections, beam energies, and recorded luminosities of a CSV export in chunks.
+
+    Parameters
+    ----------
+    path : string
+        The CSV export of brilcalc, per run or per lumisection.
+    chunk_rows : int, optional
+        The number of rows parsed at a time. The default is one million.
+
+    Yields
+    ------
+    dict of numpy arrays
+        The "run", "ls", "energy" (the center-of-mass energy in TeV), and
+        "recorded" (in inverse femtobarns) columns of up to `chunk_rows` rows.
+        The "ls" column is absent for per run exports and "energy" is absent
+        if there is no "E(GeV)" column. Nothing is yielded for an export
+        without rows.
+    """
+    with io.open(path, encoding='utf-8') as f:
+        header = None
+        lines = (line for line in f if line.strip())
+        for line in lines:
+            if line.startswith('#'):
+                if 'run' in line and 'recorded' in line:
+                    header = line
+                continue
+            if header is None:
+                raise LumiFormatError('No header line found in {0}'.format(path))
+            columns = _columns(header, line)
+            break
+        else:
+            return
+        try:
+            recorded_index, recorded_name = columns['recorded']
+            unit = UNITS[recorded_name[recorded_name.index('(') + 1:recorded_name.index(')')]]
+        except (KeyError, ValueError):
+            raise LumiFormatError('No recorded luminosity column found in {0}'.format(path))
+        wanted = [('run', columns['run'][0]), ('recorded', recorded_index)]
+        if 'ls' in columns:
+            wanted.append(('ls', columns['ls'][0]))
+        if 'E' in columns:
+            wanted.append(('energy', columns['E'][0]))
+        usecols = [index for _, index in wanted]
+        # The summary lines at the end of an export are comments.
+        rows = itertools.chain([line], (line for line in lines if not line.startswith('#')))
+        while True:
+            chunk = list(itertools.islice(rows, chunk_rows))
+            if not chunk:
+                break
+            text = u''.join(chunk).replace(u':', u',')
+            data = np.loadtxt(io.StringIO(text), delimiter=',', usecols=usecols, ndmin=2)
+            result = {}
+            for column, (name, _) in enumerate(wanted):
+                result[name] = data[:, column]
+            result['run'] = result['run'].astype(np.int64)
+            if 'ls' in result:
+                result['ls'] = result['ls'].astype(np.int64)
+            # The exported energy is the beam energy in GeV.
+            if 'energy' in result:
+                result['energy'] = np.round(2 * result['energy'] / 1000.0, 1)
+            result['recorded'] = result['recorded'] * unit / UNITS['/fb']
+            yield result
+
+
+def read_lumi_csv(path, chunk_rows=1000000):
+    """Read the run numbers, lumisections, beam energies, and recorded luminosities of a CSV export.
+
+    The whole export is held in memory. See `iter_lumi_csv` to process it
+    one chunk at a time instead.
+
+    Parameters
+    ----------
+    path : string
+        The CSV export of brilcalc, per run or per lumisection.
+    chunk_rows : int, optional
+        The number of rows parsed at a time. The default is one million.
+
+    Returns
+    -------
+    dict of numpy arrays
+        The "run", "ls", "energy" (the center-of-mass energy in TeV), and
+        "recorded" (in inverse femtobarns) columns. The "ls" column is absent
+        for per run exports and "energy" is absent if there is no "E(GeV)" column.
+    """
+    chunks = list(iter_lumi_csv(path, chunk_rows))
+    if not chunks:
+        return {'run': np.zeros(0, dtype=np.int64), 'recorded': np.zeros(0)}
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+
+def certified_mask(runs, lumisections, certified):
+    """Return a boolean mask of the rows within the certified runs and lumisections.
+
+    Parameters
+    ----------
+    runs : numpy array
+        The run numbers.
+    lumisections : numpy array or None
+        The lumisection numbers, or None to keep any run that has at least
+        one certified lumisection.
+    certified : mapping
+        The certified lumisection ranges keyed by run number, as in the
+        certification JSON files, e.g. {"273150": [[61, 64], [66, 75]]}.
+    """
+    if lumisections is None:
+        certified_runs = np.array(sorted(int(run) for run, ranges in certified.items() if ranges), dtype=np.int64)
+        return np.isin(runs, certified_runs)
+    # Encode the run and lumisection of every row and range boundary into one
+    # sortable integer, then find the range starting at or before each row.
+    ranges = sorted((int(run), first, last) for run, run_ranges in certified.items() for first, last in run_ranges)
+    if not ranges:
+        return np.zeros(len(runs), dtype=bool)
+    ranges = np.array(ranges, dtype=np.int64)
+    starts = (ranges[:, 0] << 32) | ranges[:, 1]
+    ends = (ranges[:, 0] << 32) | ranges[:, 2]
+    keys = (runs << 32) | lumisections
+    index = np.searchsorted(starts, keys, side='right') - 1
+    valid = index >= 0
+    mask = np.zeros(len(keys), dtype=bool)
+    mask[valid] = keys[valid] <= ends[index[valid]]
+    return mask
+
+
+def _cache_key(paths, certified, periods, energy):
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(repr((os.path.abspath(path), stat.st_size, stat.st_mtime)).encode('utf-8'))
+    digest.update(json.dumps([certified, periods, energy], sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def integrated_luminosity(paths, certified=None, periods=None, energy=None, cache_dir=DEFAULT_CACHE_DIR):
+    """Return the recorded luminosity per data taking period and center-of-mass energy.
+
+    Parameters
+    ----------
+    paths : string or list of strings
+        The CSV exports of brilcalc.
+    certified : string or mapping, optional
+        The path of a certification JSON file, or its contents, to only count
+        certified lumisections. Per run exports are filtered by run only. The
+        default is None for no filtering.
+    periods : mapping, optional
+        The first and last run numbers of each data taking period, keyed by
+        period name, e.g. {"2016": [272007, 284044]}. Runs outside of every
+        period are dropped. The default is None for a single unnamed period.
+    energy : float, optional
+        The center-of-mass energy in TeV of exports without a beam energy
+        column. The default is None.
+    cache_dir : string or None, optional
+        The directory of the on-disk cache of totals, or None to disable it.
+        The default is ~/.cache/cms_figure/lumi.
+
+    Returns
+    -------
+    OrderedDict
+        The luminosities in inverse femtobarns keyed by (period, energy),
+        where the period is None if no periods are given. The keys are ordered
+        by descending energy and then by period.
+    """
+    paths = [paths] if isinstance(paths, string_types) else list(paths)
+    if isinstance(certified, string_types):
+        with open(certified) as f:
+            certified = json.load(f)
+    key = _cache_key(paths, certified, periods, energy)
+    if key in _totals_cache:
+        return _totals_cache[key]
+    cache_path = os.path.join(cache_dir, key + '.json') if cache_dir else None
+    if cache_path and os.path.isfile(cache_path):
+        with open(cache_path) as f:
+            totals = OrderedDict(((period, energy), lumi) for period, energy, lumi in json.load(f))
+        _totals_cache[key] = totals
+        return totals
+
+    sums = {}
+    period_names = sorted(periods, key=lambda name: periods[name][0]) if periods else []
+    period_starts = np.array([periods[name][0] for name in period_names], dtype=np.int64)
+    period_ends = np.array([periods[name][1] for name in period_names], dtype=np.int64)
+    for path in paths:
+        # Only the sums are kept from one chunk to the next.
+        for table in iter_lumi_csv(path):
+            runs, recorded = table['run'], table['recorded']
+            if 'energy' in table:
+                energies = table['energy']
+            elif energy is not None:
+                energies = np.full(len(runs), float(energy))
+            else:
+                raise LumiFormatError('No beam energy column in {0}, so the energy must be given'.format(path))
+            keep = np.ones(len(runs), dtype=bool)
+            if certified is not None:
+                keep &= certified_mask(runs, table.get('ls'), certified)
+            if periods:
+                period_index = np.searchsorted(period_starts, runs, side='right') - 1
+                keep &= period_index >= 0
+                keep[keep] &= runs[keep] <= period_ends[period_index[keep]]
+            else:
+                period_index = np.zeros(len(runs), dtype=np.int64)
+            # Sum the luminosity of every (period, energy) group at once.
+            groups = np.stack([period_index[keep], np.round(energies[keep] * 10).astype(np.int64)], axis=1)
+            if not len(groups):
+                continue
+            unique, inverse = np.unique(groups, axis=0, return_inverse=True)
+            totals = np.bincount(inverse.ravel(), weights=recorded[keep])
+            for (index, tenths), lumi in zip(unique, totals):
+                group = (period_names[index] if periods else None, int(tenths) / 10.0)
+                sums[group] = sums.get(group, 0.0) + float(lumi)
+    order = sorted(sums, key=lambda group: (-group[1], periods[group[0]][0] if periods else 0))
+    totals = OrderedDict((group, sums[group]) for group in order)
+
+    _totals_cache[key] = totals
+    if cache_path:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        temporary = '{0}.{1}.tmp'.format(cache_path, os.getpid())
+        with open(temporary, 'w') as f:
+            json.dump([[period, energy, lumi] for (period, energy), lumi in totals.items()], f)
+        os.rename(temporary, cache_path)
+    return totals
+
+
+def format_lumi_text(totals, precision=1):
+    """Format luminosity totals as the text of a `LuminosityLabel`.
+
+    Totals below one inverse femtobarn are given in inverse picobarns. The
+    data taking periods are separated by the "+" symbol, e.g.
+    "19.7 fb^{-1} (8 TeV) + 4.9 fb^{-1} (7 TeV)" or
+    "36.3 fb^{-1} (2016, 13 TeV) + 41.5 fb^{-1} (2017, 13 TeV)".
+
+    Parameters
+    ----------
+    totals : mapping
+        The luminosities in inverse femtobarns keyed by (period, energy), as
+        returned by `integrated_luminosity`.
+    precision : int, optional
+        The number of decimal places. The default is 1.
+    """
+    parts = []
+    for (period, energy), lumi in totals.items():
+        if lumi < 1:
+            amount = '{0:.{1}f} pb^{{-1}}'.format(lumi * 1000, precision)
+        else:
+            amount = '{0:.{1}f} fb^{{-1}}'.format(lumi, precision)
+        condition = '{0:g} TeV'.format(energy) if period is None else '{0}, {1:g} TeV'.format(period, energy)
+        parts.append('{0} ({1})'.format(amount, condition))
+    return ' + '.join(parts)
+
+
+def build_lumi_text(paths, certified=None, periods=None, energy=None, precision=1, cache_dir=DEFAULT_CACHE_DIR):
+    """Return the luminosity label text for luminosity CSV exports.
+
+    See `integrated_luminosity` for the parameters and `format_lumi_text`
+    for the format of the text:
+
+        lumi_text = cms_figure.build_lumi_text('lumi_byls.csv', certified='Cert_13TeV_Golden.json')
+        cms_figure.draw_labels(lumi_text)
+    """
+    totals = integrated_luminosity(paths, certified, periods, energy, cache_dir)
+    return format_lumi_text(totals, precision)
@@ -0,0 +1,212 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""A matplotlib backend for the CMS figure style and labels.
+
+Figures made from NumPy arrays can have the CMS look without loading ROOT.
+The P-TDR margins, fonts, and ticks are translated from `TDR_STYLE_SPEC` into
+matplotlib rc parameters, and the labels are placed by the same layout
+functions as the ROOT labels, so the two backends cannot drift apart:
+
+    import matplotlib.pyplot as plt
+    from cms_figure import mpl
+
+    with mpl.tdr_style():
+        fig, ax = plt.subplots()
+        ax.hist(values, bins=50, histtype='step')
+        mpl.draw_labels('19.7 fb^{-1} (8 TeV)', extra_text='Preliminary', ax=ax)
+        fig.savefig('figure.pdf')
+
+This module requires matplotlib but not ROOT, and importing it does not
+import ROOT. It supports the same Python versions as the package (Python 2.7
+as declared in setup.py, and Python 3) with matplotlib 2.2 or later. The rc
+parameters unknown to older matplotlib versions, such as the axis title
+locations added in matplotlib 3.3, are left out.
+"""
+
+import re
+
+import matplotlib
+import matplotlib.pyplot as plt
+
+from .layout import (
+    CMS_LABEL_DEFAULTS, CMS_SUBLABEL_DEFAULTS, LUMI_LABEL_DEFAULTS,
+    cms_label_layout, luminosity_label_layout,
+)
+from .style_spec import TDR_STYLE_SPEC
+
+
+# The resolution relating the canvas size in pixels to the figure size in inches.
+DPI = 100
+
+# The sans-serif fonts closest to ROOT's Helvetica, in order of preference.
+SANS_SERIF = ['Helvetica', 'Arial', 'Liberation Sans', 'Nimbus Sans', 'DejaVu Sans']
+
+# The matplotlib font weight and style of the ROOT font codes divided by 10.
+FONT_STYLES = {
+    4: ('normal', 'normal'), # Helvetica
+    5: ('normal', 'italic'), # Helvetica Italic
+    6: ('bold', 'normal'), # Helvetica Bold
+    7: ('bold', 'italic'), # Helvetica Bold Italic
+}
+
+# The matplotlib horizontal and vertical alignments of the digits of the ROOT
+# text alignment codes.
+HORIZONTAL_ALIGNMENT = {1: 'left', 2: 'center', 3: 'right'}
+VERTICAL_ALIGNMENT = {1: 'baseline', 2: 'center', 3: 'top'}
+
+
+def tdr_rcparams(spec=TDR_STYLE_SPEC):
+    """Return the matplotlib rc parameters reproducing a ROOT style spec.
+
+    The canvas size, pad margins, axis title and label sizes, and tick marks
+    are translated. ROOT text sizes are fractions of the canvas height, which
+    are converted to points for the figure size, so specs giving text sizes
+    in pixels (font precision 3) are not supported. Parameters unknown to
+    the installed matplotlib version are left out.
+    """
+    settings = spec.settings
+    width = settings['CanvasDefW'] / float(DPI)
+    height = settings['CanvasDefH'] / float(DPI)
+    points = min(width, height) * 72
+    frame_height = (1 - settings['PadTopMargin'] - settings['PadBottomMargin']) * height * 72
+    tick_length = settings['TickLength:XYZ'] * frame_height
+    params = {
+        'figure.figsize': (width, height),
+        'figure.dpi': DPI,
+        'figure.subplot.left': settings['PadLeftMargin'],
+        'figure.subplot.right': 1 - settings['PadRightMargin'],
+        'figure.subplot.bottom': settings['PadBottomMargin'],
+        'figure.subplot.top': 1 - settings['PadTopMargin'],
+        'font.family': 'sans-serif',
+        'font.sans-serif': SANS_SERIF,
+        'mathtext.fontset': 'custom',
+        'mathtext.rm': 'sans',
+        'mathtext.it': 'sans:italic',
+        'mathtext.bf': 'sans:bold',
+        'mathtext.sf': 'sans',
+        'mathtext.cal': 'sans:italic',
+        'axes.labelsize': settings['TitleSize:XYZ'] * points,
+        'axes.titlesize': settings['TitleSize:XYZ'] * points,
+        'axes.linewidth': settings['FrameLineWidth'],
+        'axes.grid': bool(settings['PadGridX'] or settings['PadGridY']),
+        'axes.formatter.use_mathtext': True,
+        'xtick.labelsize': settings['LabelSize:XYZ'] * points,
+        'ytick.labelsize': settings['LabelSize:XYZ'] * points,
+        'xtick.direction': 'in',
+        'ytick.direction': 'in',
+        'xtick.top': bool(settings['PadTickX']),
+        'ytick.right': bool(settings['PadTickY']),
+        'xtick.minor.visible': True,
+        'ytick.minor.visible': True,
+        'xtick.major.size': tick_length,
+        'ytick.major.size': tick_length,
+        'xtick.minor.size': tick_length / 2,
+        'ytick.minor.size': tick_length / 2,
+        'xaxis.labellocation': 'right',
+        'yaxis.labellocation': 'top',
+        'legend.frameon': False,
+        'lines.linewidth': settings['HistLineWidth'],
+        'hatch.linewidth': settings['HatchesLineWidth'] / 5.0,
+    }
+    return {key: value for key, value in params.items() if key in matplotlib.rcParams}
+
+
+def tdr_style(spec=TDR_STYLE_SPEC):
+    """Return a context manager applying the P-TDR style to the figures created inside of it."""
+    return matplotlib.rc_context(tdr_rcparams(spec))
+
+
+def latex_to_mathtext(text):
+    """Convert the TLatex superscripts, subscripts, and Greek letters of a text to mathtext."""
+    text = re.sub(r'#([A-Za-z]+)(\{[^{}]*\})?', r'$\\\1\2$', text)
+    text = re.sub(r'([\^_])\{([^{}]*)\}', r'$\1{\2}$', text)
+    # Merge the math segments that directly follow each other.
+    return text.replace('$$', '')
+
+
+def _draw_text(figure, placement, text, font):
+    """Draw text on a figure according to a placement computed by the layout functions."""
+    weight, style = FONT_STYLES.get(font // 10, FONT_STYLES[4])
+    width, height = figure.get_size_inches()
+    horizontal, vertical = divmod(placement.align, 10)
+    return figure.text(
+        placement.x, placement.y, latex_to_mathtext(text),
+        transform=figure.transFigure,
+        fontsize=placement.size * min(width, height) * 72,
+        fontweight=weight,
+        fontstyle=style,
+        ha=HORIZONTAL_ALIGNMENT[horizontal],
+        va=VERTICAL_ALIGNMENT[vertical],
+    )
+
+
+def get_axes_margins(ax):
+    """Return the top, right, bottom, and left margins of an axes within its figure."""
+    box = ax.get_position()
+    return 1 - box.y1, 1 - box.x1, box.y0, box.x0
+
+
+def draw_labels(lumi_text, cms_position='left', extra_text='', ax=None):
+    """Draw the CMS Publication Committee figure labels on the figure of an axes.
+
+    The labels are placed exactly as by `cms_figure.draw_labels` on a ROOT
+    canvas with the same margins as the axes.
+
+    Parameters
+    ----------
+    lumi_text, cms_position, extra_text
+        See `cms_figure.draw_labels`. The "auto" position is not supported.
+    ax : matplotlib Axes, optional
+        The axes to label. The default is the current axes.
+
+    Returns
+    -------
+    list of matplotlib Text
+        The drawn label texts.
+    """
+    ax = ax or plt.gca()
+    figure = ax.figure
+    margins = get_axes_margins(ax)
+    label_placement, sublabel_placement = cms_label_layout(
+        margins,
+        position=cms_position,
+        scale=CMS_LABEL_DEFAULTS['scale'],
+        padding_left=CMS_LABEL_DEFAULTS['padding_left'],
+        padding_right=CMS_LABEL_DEFAULTS['padding_right'],
+        padding_top=CMS_LABEL_DEFAULTS['padding_top'],
+        sublabel=bool(extra_text),
+        sublabel_scale=CMS_SUBLABEL_DEFAULTS['scale'],
+        sublabel_padding_left=CMS_SUBLABEL_DEFAULTS['padding_left'],
+        sublabel_padding_top=CMS_SUBLABEL_DEFAULTS['padding_top'],
+    )
+    texts = [_draw_text(figure, label_placement, CMS_LABEL_DEFAULTS['text'], CMS_LABEL_DEFAULTS['font'])]
+    if sublabel_placement is not None:
+        texts.append(_draw_text(figure, sublabel_placement, extra_text, CMS_SUBLABEL_DEFAULTS['font']))
+    lumi_placement = luminosity_label_layout(
+        margins,
+        scale=LUMI_LABEL_DEFAULTS['scale'],
+        align=LUMI_LABEL_DEFAULTS['align'],
+        padding_top=LUMI_LABEL_DEFAULTS['padding_top'],
+    )
+    texts.append(_draw_text(figure, lumi_placement, lumi_text, LUMI_LABEL_DEFAULTS['font']))
+    return texts
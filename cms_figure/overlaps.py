@@ -0,0 +1,164 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Detection of overlaps between the figure labels and legends.
+
+The labels are placed purely from the canvas margins and padding, so long
+luminosity texts or a sublabel outside of the frame can collide with other
+labels or with a legend. The extents of the drawn labels are measured with
+ROOT and cached on the text, font, size, and pad dimensions, which makes
+checking every figure of a large campaign cheap.
+"""
+
+from collections import namedtuple
+
+import ROOT
+
+from .instrument import instrument
+from .layout import Box, Placement, memoize, text_box
+from .utils import LabelRenderer
+
+
+# The names of the label primitives drawn by a LabelRenderer.
+LABEL_NAMES = (LabelRenderer.CMS_LABEL_NAME, LabelRenderer.CMS_SUBLABEL_NAME, LabelRenderer.LUMI_LABEL_NAME)
+
+
+class Overlap(namedtuple('Overlap', ['first', 'second', 'first_box', 'second_box'])):
+    """A pair of overlapping labels or legends, named by their primitive names."""
+    __slots__ = ()
+
+
+@memoize
+@instrument('measure_text')
+def _measure_text(text, font, size, pad_width, pad_height):
+    """Return the width and height of the text in NDC of the active pad."""
+    latex = ROOT.TLatex(0, 0, text)
+    latex.SetNDC()
+    latex.SetTextFont(font)
+    latex.SetTextSize(size)
+    pad = ROOT.gPad
+    return (
+        latex.GetXsize() / (pad.GetX2() - pad.GetX1()),
+        latex.GetYsize() / (pad.GetY2() - pad.GetY1()),
+    )
+
+
+def measure_text(text, font, size, pad):
+    """Return the width and height in NDC of text drawn on a pad.
+
+    The measurements are cached on the text, font, size, and the pad's
+    dimensions in pixels.
+
+    Parameters
+    ----------
+    text : string
+        The text, which may use TLatex syntax.
+    font : int
+        The text font code.
+    size : float
+        The text size relative to the pad.
+    pad : TPad
+        The pad the text is drawn on.
+    """
+    pad_width = int(pad.GetWw() * pad.GetAbsWNDC())
+    pad_height = int(pad.GetWh() * pad.GetAbsHNDC())
+    # TLatex measures text in gPad, which is kept per thread once ROOT's
+    # thread safety is enabled, so the pad is activated only briefly.
+    previous_pad = ROOT.gPad
+    pad.cd()
+    try:
+        return _measure_text(text, font, float(size), pad_width, pad_height)
+    finally:
+        if previous_pad:
+            previous_pad.cd()
+
+
+def _legends(pad):
+    """Return the legends drawn on a pad with their names.
+
+    Unnamed legends are named "legend" followed by their index.
+    """
+    legends = [primitive for primitive in pad.GetListOfPrimitives() if primitive.InheritsFrom('TLegend')]
+    return [(legend.GetName() or 'legend{0}'.format(index), legend) for index, legend in enumerate(legends)]
+
+
+def label_boxes(pad):
+    """Return the boxes of the labels and legends drawn on a pad, keyed by their names.
+
+    Only the labels drawn through a `LabelRenderer` (including `draw_labels`)
+    are found. See `_legends` for the names of the legends.
+    """
+    boxes = {}
+    primitives = pad.GetListOfPrimitives()
+    for name in LABEL_NAMES:
+        label = primitives.FindObject(name)
+        if label:
+            width, height = measure_text(label.GetTitle(), label.GetTextFont(), label.GetTextSize(), pad)
+            placement = Placement(label.GetX(), label.GetY(), label.GetTextSize(), label.GetTextAlign())
+            boxes[name] = text_box(placement, width, height)
+    for name, legend in _legends(pad):
+        boxes[name] = Box(legend.GetX1NDC(), legend.GetY1NDC(), legend.GetX2NDC(), legend.GetY2NDC())
+    return boxes
+
+
+@instrument('check_overlaps')
+def check_overlaps(pad=None, fix=False):
+    """Return the overlaps between the labels and legends drawn on a pad.
+
+    Parameters
+    ----------
+    pad : TPad, optional
+        The pad to check. The default is the active pad.
+    fix : bool, optional
+        Whether to move legends that overlap a label down below the lowest
+        such label. A legend is only moved if it still fits above the bottom
+        margin. Overlaps between labels are only reported. The default is False.
+
+    Returns
+    -------
+    list of Overlap
+        The overlaps that remain (after fixing, if requested).
+    """
+    pad = pad or ROOT.gPad
+    boxes = label_boxes(pad)
+    if fix:
+        labels = [boxes[name] for name in LABEL_NAMES if name in boxes]
+        for name, legend in _legends(pad):
+            box = boxes[name]
+            hit = [label for label in labels if label.overlaps(box)]
+            if not hit:
+                continue
+            # Leave a small gap between the lowest overlapping label and the legend.
+            top = min(label.y1 for label in hit) - 0.01
+            bottom = top - (box.y2 - box.y1)
+            if bottom < pad.GetBottomMargin():
+                continue
+            legend.SetY1NDC(bottom)
+            legend.SetY2NDC(top)
+            boxes[name] = Box(box.x1, bottom, box.x2, top)
+        pad.Modified()
+    names = sorted(boxes)
+    return [
+        Overlap(first, second, boxes[first], boxes[second])
+        for i, first in enumerate(names) for second in names[i + 1:]
+        if boxes[first].overlaps(boxes[second])
+    ]
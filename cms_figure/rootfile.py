@@ -0,0 +1,163 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Drawing figures straight from the objects stored in ROOT files."""
+
+import fnmatch
+from collections import OrderedDict
+
+import ROOT
+
+from .compat import string_types
+from .instrument import instrument
+from .utils import draw_labels
+
+
+# The files opened by open_file, keyed by path.
+_open_files = OrderedDict()
+
+# The number of files kept open by open_file.
+MAX_OPEN_FILES = 16
+
+
+def open_file(path):
+    """Return a ROOT file opened for reading, reusing it if it is already open.
+
+    Up to `MAX_OPEN_FILES` files are kept open, so that long running processes
+    drawing many figures from the same files only open them once.
+    """
+    tfile = _open_files.get(path)
+    if tfile and tfile.IsOpen():
+        return tfile
+    if len(_open_files) >= MAX_OPEN_FILES:
+        # Close the file opened the longest time ago.
+        _open_files.popitem(last=False)[1].Close()
+    tfile = ROOT.TFile.Open(path, 'READ')
+    if not tfile or tfile.IsZombie():
+        raise IOError('Unable to open the ROOT file {0}'.format(path))
+    _open_files[path] = tfile
+    return tfile
+
+
+def close_files():
+    """Close every file opened by open_file."""
+    while _open_files:
+        _open_files.popitem()[1].Close()
+
+
+def match_keys(directory, pattern):
+    """Return the paths of the keys in a ROOT file or directory matching a pattern.
+
+    The pattern is matched with fnmatch against the key names, one directory
+    level per "/" separated part, so only the key lists of the directories
+    leading to the matches are read and no objects are. Each name is returned
+    once, however many cycles it has, in the order of the key list.
+
+    Parameters
+    ----------
+    directory : TDirectory
+        The ROOT file or directory to search.
+    pattern : string
+        The shell-style pattern, e.g. "h_pt_*" or "signal_*/h_mass".
+    """
+    head, _, tail = pattern.partition('/')
+    matches = []
+    seen = set()
+    for key in directory.GetListOfKeys():
+        name = key.GetName()
+        if name in seen or not fnmatch.fnmatchcase(name, head):
+            continue
+        seen.add(name)
+        if not tail:
+            matches.append(name)
+        elif ROOT.TClass.GetClass(key.GetClassName()).InheritsFrom('TDirectory'):
+            subdirectory = directory.GetDirectory(name)
+            matches.extend('{0}/{1}'.format(name, match) for match in match_keys(subdirectory, tail))
+    return matches
+
+
+def read_objects(tfile, names):
+    """Read the named objects from a ROOT file, only reading their own keys.
+
+    Histograms are detached from the file so that they outlive it.
+    """
+    objects = []
+    for name in names:
+        obj = tfile.Get(name)
+        if not obj:
+            raise KeyError('No object named {0} in {1}'.format(name, tfile.GetName()))
+        if obj.InheritsFrom('TH1'):
+            obj.SetDirectory(0)
+        objects.append(obj)
+    return objects
+
+
+@instrument('render_file_figure')
+def render_file_figure(path, objects, outputs, lumi_text, cms_position='left', extra_text='', draw_options='',
+                       decimate=False):
+    """Draw objects read from a ROOT file on one canvas, label it, and save it.
+
+    The first object is drawn with its draw option and the others are drawn
+    on top of it with "same" appended to their draw options.
+
+    Parameters
+    ----------
+    path : string
+        The path (or URL) of the ROOT file.
+    objects : list of strings
+        The names (including any directory path) of the objects to draw.
+    outputs : list of strings
+        The output file paths passed to the canvas's SaveAs method.
+    lumi_text, cms_position, extra_text
+        See `draw_labels`.
+    draw_options : string or list of strings, optional
+        The draw option of every object, or one per object, otherwise a
+        ValueError is raised. The default is an empty string.
+    decimate : bool, optional
+        Whether to reduce the histograms and graphs to the pixel width of the
+        canvas before drawing them, which requires NumPy. See
+        `cms_figure.decimate`. The default is False.
+
+    Returns
+    -------
+    list of strings
+        The output file paths.
+    """
+    if isinstance(draw_options, string_types):
+        draw_options = [draw_options] * len(objects)
+    elif len(draw_options) != len(objects):
+        raise ValueError('{0} draw options given for {1} objects'.format(len(draw_options), len(objects)))
+    drawn = read_objects(open_file(path), objects)
+    canvas = ROOT.TCanvas('cms_figure_file_figure', '')
+    if decimate:
+        # Imported here since NumPy is an optional dependency.
+        from .decimation import decimate as reduce_object
+        drawn = [reduce_object(obj, canvas) for obj in drawn]
+    try:
+        for index, (obj, option) in enumerate(zip(drawn, draw_options)):
+            obj.Draw(option if index == 0 else option + ' same')
+        draw_labels(lumi_text, cms_position, extra_text)
+        for output in outputs:
+            canvas.SaveAs(output)
+    finally:
+        canvas.Close()
+    return list(outputs)
@@ -0,0 +1,145 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import threading
+
+import ROOT
+
+from .instrument import instrument
+
+
+# The entered drawing sessions of each thread, innermost last.
+_local = threading.local()
+
+
+def _session_stack():
+    """Return the stack of drawing sessions entered on the current thread."""
+    try:
+        return _local.stack
+    except AttributeError:
+        stack = _local.stack = []
+        return stack
+
+
+def _address(obj):
+    """Return the C++ address of a PyROOT object."""
+    addressof = getattr(ROOT, 'addressof', None)
+    if addressof is not None:
+        return addressof(obj)
+    return ROOT.AddressOf(obj)[0]
+
+
+def current_session():
+    """Return the innermost drawing session active on the current thread, or None."""
+    stack = _session_stack()
+    return stack[-1] if stack else None
+
+
+class DrawingSession(object):
+    """A context for drawing figures headlessly with deferred canvas updates.
+
+    Updating a canvas repaints it, so drawing several things and labelling a
+    figure before saving it can repaint it many times over. Inside of a session,
+    the canvas updates requested by this package (e.g. by `draw_labels`) are
+    held back and each canvas is painted once, either when it is saved through
+    `save` or when the session exits. Updates requested directly through ROOT
+    are unaffected.
+
+    The session also switches ROOT to batch mode, so no graphics windows are
+    opened and no X11 connection is needed. Batch mode only applies to canvases
+    created inside of the session.
+
+    Sessions are kept per thread, so a session only holds back the updates
+    requested on the thread that entered it.
+
+    A session does not keep canvases alive. Canvases deleted before they are
+    saved, e.g. because their figure was fetched from a `FigureCache`, are
+    simply never painted.
+
+        with cms_figure.DrawingSession() as session:
+            canvas = ROOT.TCanvas()
+            # Draw stuff here...
+            cms_figure.draw_labels('19.7 fb^{-1} (8 TeV)')
+            session.save(canvas, 'figure.pdf', 'figure.png')
+
+    Parameters
+    ----------
+    batch : bool, optional
+        Whether to switch ROOT to batch mode for the session. The default is True.
+    """
+    def __init__(self, batch=True):
+        self.batch = batch
+        # The C++ addresses of the canvases with held back updates, in order.
+        self._pending = []
+        self._previous_batch = None
+
+    def __enter__(self):
+        """Enter the session, switching ROOT to batch mode if requested."""
+        self._previous_batch = ROOT.gROOT.IsBatch()
+        if self.batch:
+            ROOT.gROOT.SetBatch(True)
+        _session_stack().append(self)
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        """Paint the canvases with held back updates and restore the previous batch mode."""
+        try:
+            self.flush()
+        finally:
+            _session_stack().remove(self)
+            ROOT.gROOT.SetBatch(self._previous_batch)
+
+    def defer(self, pad):
+        """Hold back the update of a pad until its canvas is saved or the session exits."""
+        pad.Modified()
+        address = _address(pad.GetCanvas())
+        if address not in self._pending:
+            self._pending.append(address)
+
+    @instrument('session_flush')
+    def flush(self, canvas=None):
+        """Paint the canvases with held back updates.
+
+        Parameters
+        ----------
+        canvas : TCanvas, optional
+            Only paint this canvas. The default is None for all canvases.
+        """
+        if canvas is not None:
+            address = _address(canvas)
+            if address in self._pending:
+                self._pending.remove(address)
+                canvas.Update()
+            return
+        pending, self._pending = self._pending, []
+        # Only the addresses are kept, so the canvases are looked up among the
+        # live ones, which skips those deleted during the session.
+        canvases = {_address(live): live for live in ROOT.gROOT.GetListOfCanvases()}
+        for address in pending:
+            if address in canvases:
+                canvases[address].Update()
+
+    def save(self, canvas, *paths):
+        """Paint a canvas once and save it to each of the given file paths."""
+        self.flush(canvas)
+        for path in paths:
+            canvas.SaveAs(path)
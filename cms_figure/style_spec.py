@@ -0,0 +1,290 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Declarative plotting style definitions.
+
+A style is described by a table of TStyle attributes and their values, where
+each attribute is the name of a TStyle setter without the "Set" prefix and
+optionally followed by a colon and the axes it applies to, e.g. "TitleSize:XYZ"
+for SetTitleSize(0.06, "XYZ"). A value that is a list is passed to the setter
+as several arguments, e.g. "PaperSize": [20, 20] for SetPaperSize(20, 20).
+
+The tables can be saved to and loaded from JSON or YAML files, exported as a
+ROOT macro, and compared so that switching a style from one table to another
+only calls the setters of the attributes that differ.
+"""
+
+import json
+from collections import OrderedDict
+
+
+class StyleSpec(object):
+    """A named table of TStyle attributes and their values.
+
+    Parameters
+    ----------
+    name : string
+        The style name.
+    title : string
+        The style title.
+    settings : mapping or iterable of pairs
+        The attributes and their values, which are applied in order.
+    """
+    def __init__(self, name, title, settings):
+        self.name = name
+        self.title = title
+        self.settings = OrderedDict(settings)
+
+    def __eq__(self, other):
+        # The order of the settings is irrelevant to the resulting style.
+        return isinstance(other, StyleSpec) and dict(self.settings) == dict(other.settings)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'StyleSpec({0!r}, {1!r}, <{2} settings>)'.format(self.name, self.title, len(self.settings))
+
+    def updated(self, overrides, name=None, title=None):
+        """Return a new spec with some attributes overridden.
+
+        Overridden attributes keep their place in the table and new attributes
+        are appended to it.
+        """
+        settings = OrderedDict(self.settings)
+        settings.update(overrides)
+        return StyleSpec(name or self.name, title or self.title, settings)
+
+    def delta(self, other):
+        """Return the settings of another spec that differ from this spec, in the other's order.
+
+        Attributes of this spec that are absent from the other spec are not
+        part of the delta, since the other spec has no value to restore.
+        """
+        missing = object()
+        return OrderedDict(
+            (attribute, value) for attribute, value in other.settings.items()
+            if self.settings.get(attribute, missing) != value
+        )
+
+    def apply(self, style, settings=None):
+        """Call the setters of a TStyle for the settings of this spec.
+
+        Parameters
+        ----------
+        style : TStyle
+            The style to modify.
+        settings : mapping, optional
+            A subset of the settings to apply, such as the result of `delta`.
+            The default is all of the settings of this spec.
+        """
+        for attribute, value in (self.settings if settings is None else settings).items():
+            setter, args = _setter_call(attribute, value)
+            getattr(style, setter)(*args)
+
+    def to_dict(self):
+        return OrderedDict([('name', self.name), ('title', self.title), ('settings', self.settings)])
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['title'], data['settings'])
+
+    def save(self, path):
+        """Save the spec to a JSON file, or a YAML file if the path ends with .yaml or .yml.
+
+        YAML mappings are unordered, so the settings are written to YAML files
+        as a list of single-entry mappings to keep the order of the setters.
+        """
+        with open(path, 'w') as f:
+            if is_yaml(path):
+                yaml = import_yaml()
+                settings = [{attribute: value} for attribute, value in self.settings.items()]
+                yaml.safe_dump(
+                    {'name': self.name, 'title': self.title, 'settings': settings},
+                    f, default_flow_style=False,
+                )
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+                f.write('\n')
+
+    @classmethod
+    def load(cls, path):
+        """Load a spec from a JSON file, or a YAML file if the path ends with .yaml or .yml."""
+        with open(path) as f:
+            if is_yaml(path):
+                data = import_yaml().safe_load(f)
+                if isinstance(data['settings'], list):
+                    data['settings'] = [pair for entry in data['settings'] for pair in entry.items()]
+                return cls.from_dict(data)
+            return cls.from_dict(json.load(f, object_pairs_hook=OrderedDict))
+
+    def to_macro(self, function_name=None):
+        """Return the source of a ROOT macro that creates and activates the style.
+
+        Parameters
+        ----------
+        function_name : string, optional
+            The name of the macro function. The default is "set" followed by
+            the style name with its first letter capitalized.
+        """
+        variable = self.name.replace(' ', '_')
+        function_name = function_name or 'set' + variable[:1].upper() + variable[1:]
+        lines = [
+            'void {0}() {{'.format(function_name),
+            '  TStyle *{0} = new TStyle({1}, {2});'.format(variable, _cpp_literal(self.name), _cpp_literal(self.title)),
+        ]
+        for attribute, value in self.settings.items():
+            setter, args = _setter_call(attribute, value)
+            lines.append('  {0}->{1}({2});'.format(variable, setter, ', '.join(_cpp_literal(arg) for arg in args)))
+        lines.extend(['  {0}->cd();'.format(variable), '}', ''])
+        return '\n'.join(lines)
+
+    def save_macro(self, path, function_name=None):
+        """Save the spec as a ROOT macro. See `to_macro`."""
+        with open(path, 'w') as f:
+            f.write(self.to_macro(function_name))
+
+
+def _setter_call(attribute, value):
+    """Return the setter name and arguments for an attribute and its value."""
+    name, _, axes = attribute.partition(':')
+    args = list(value) if isinstance(value, (list, tuple)) else [value]
+    if axes:
+        args.append(axes)
+    return 'Set' + name, args
+
+
+def _cpp_literal(value):
+    if isinstance(value, bool):
+        return 'kTRUE' if value else 'kFALSE'
+    elif isinstance(value, float):
+        return repr(value)
+    elif isinstance(value, int):
+        return str(value)
+    return json.dumps(str(value))
+
+
+def is_yaml(path):
+    """Return whether a file path names a YAML file rather than a JSON file."""
+    return path.endswith(('.yaml', '.yml'))
+
+
+def import_yaml():
+    """Return the PyYAML module, which is an optional dependency."""
+    try:
+        import yaml
+    except ImportError:
+        raise ImportError('Unable to import yaml. Please install PyYAML to read and write YAML files.')
+    return yaml
+
+
+# The CMS Technical Design Report (TDR) plotting style. Unused styling
+# options in the original definition have been removed for clarity.
+TDR_STYLE_SPEC = StyleSpec('tdrStyle', 'Style for P-TDR', [
+    # Canvas
+    ('CanvasBorderMode', 0),
+    ('CanvasColor', 0),
+    ('CanvasDefH', 600), # Height
+    ('CanvasDefW', 600), # Width
+    ('CanvasDefX', 0), # On-Screen Position
+    ('CanvasDefY', 0),
+    # Pad
+    ('PadBorderMode', 0),
+    ('PadColor', 0),
+    ('PadGridX', False),
+    ('PadGridY', False),
+    ('GridColor', 0),
+    ('GridStyle', 3),
+    ('GridWidth', 1),
+    # Frame
+    ('FrameBorderMode', 0),
+    ('FrameBorderSize', 1),
+    ('FrameFillColor', 0),
+    ('FrameFillStyle', 0),
+    ('FrameLineColor', 1),
+    ('FrameLineStyle', 1),
+    ('FrameLineWidth', 1),
+    # Histogram
+    ('HistLineColor', 1),
+    ('HistLineStyle', 0),
+    ('HistLineWidth', 1),
+    ('EndErrorSize', 2),
+    ('MarkerStyle', 20),
+    # Fit/Function
+    ('OptFit', 1),
+    ('FitFormat', '5.4g'),
+    ('FuncColor', 2),
+    ('FuncStyle', 1),
+    ('FuncWidth', 1),
+    # Date
+    ('OptDate', 0),
+    # Statistics Box
+    ('OptFile', 0),
+    ('OptStat', 0), # Pass 'mr' to display the mean and RMS.
+    ('StatColor', 0),
+    ('StatFont', 42),
+    ('StatFontSize', 0.025),
+    ('StatTextColor', 1),
+    ('StatFormat', '6.4g'),
+    ('StatBorderSize', 1),
+    ('StatH', 0.1),
+    ('StatW', 0.15),
+    # Margins
+    ('PadTopMargin', 0.05),
+    ('PadBottomMargin', 0.13),
+    ('PadLeftMargin', 0.16),
+    ('PadRightMargin', 0.02),
+    # Global Title
+    ('OptTitle', 0), # 0 = No Title
+    ('TitleFont', 42),
+    ('TitleColor', 1),
+    ('TitleTextColor', 1),
+    ('TitleFillColor', 10),
+    ('TitleFontSize', 0.05),
+    # Axis Titles
+    ('TitleColor:XYZ', 1),
+    ('TitleFont:XYZ', 42),
+    ('TitleSize:XYZ', 0.06),
+    ('TitleXOffset', 0.9),
+    ('TitleYOffset', 1.25),
+    # Axis Labels
+    ('LabelColor:XYZ', 1),
+    ('LabelFont:XYZ', 42),
+    ('LabelOffset:XYZ', 0.007),
+    ('LabelSize:XYZ', 0.05),
+    # Axes
+    ('AxisColor:XYZ', 1),
+    ('StripDecimals', True),
+    ('TickLength:XYZ', 0.03),
+    ('Ndivisions:XYZ', 510),
+    ('PadTickX', 1), # 0 = Text labels (and ticks) only on bottom, 1 = Text labels on top and bottom
+    ('PadTickY', 1),
+    # Log Scale Axes
+    ('OptLogx', 0),
+    ('OptLogy', 0),
+    ('OptLogz', 0),
+    # Postscript Options
+    ('PaperSize', [20, 20]),
+    # Hatches
+    ('HatchesLineWidth', 5),
+    ('HatchesSpacing', 0.05),
+])
@@ -20,113 +20,178 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import contextlib
+from collections import OrderedDict
+
 import ROOT
 
+from .instrument import instrument
+from .style_spec import TDR_STYLE_SPEC
+
+
+# The previous gStyles of the entered style contexts, innermost last.
+_style_stack = []
+
+# The styles built by get_style, keyed by variant name.
+_style_registry = {}
+
+# The settings deriving each named variant from the base P-TDR style.
+STYLE_VARIANTS = {
+    # An 800x600 canvas keeping the left and right margins of the
+    # base style the same size in pixels.
+    'wide': [
+        ('CanvasDefW', 800),
+        ('PadLeftMargin', 0.12),
+        ('PadRightMargin', 0.015),
+        ('TitleYOffset', 0.95),
+    ],
+    # Room on the right for the color palette of 2D histograms drawn with COLZ.
+    '2d': [
+        ('PadRightMargin', 0.15),
+        ('NumberContours', 255),
+    ],
+    # A taller canvas for a main pad stacked on a ratio pad. The axis text
+    # sizes are given in pixels (font precision 3) so that they are the same
+    # in both pads regardless of their heights.
+    'ratio': [
+        ('CanvasDefH', 800),
+        ('TitleFont:XYZ', 43),
+        ('TitleSize:XYZ', 36),
+        ('LabelFont:XYZ', 43),
+        ('LabelSize:XYZ', 30),
+    ],
+}
+
 
 class TDRStyle(ROOT.TStyle):
     """The CMS Technical Design Report (TDR) plotting style.
 
-    Unused styling options in the original definition have been removed
-    for clarity.
+    The style options are defined by a `StyleSpec` table, which is
+    `TDR_STYLE_SPEC` unless another spec is given. The spec of the style's
+    current settings is exposed as the `spec` instance attribute.
+
+    Building the style makes many calls into ROOT and registers another style
+    with gROOT, so use `get_style` to share a single instance per process.
+
+    Parameters
+    ----------
+    base : TDRStyle, optional
+        An existing style to copy, only applying the settings that differ
+        between its spec and `spec`, instead of setting the style options one
+        by one. The default is None.
+    spec : StyleSpec, optional
+        The style definition, which also provides the style name and title.
+        The default is the P-TDR style.
     """
-    def __init__(self):
-        super(TDRStyle, self).__init__('tdrStyle', 'Style for P-TDR')
-        # Canvas
-        self.SetCanvasBorderMode(0)
-        self.SetCanvasColor(0)
-        self.SetCanvasDefH(600) # Height
-        self.SetCanvasDefW(600) # Width
-        self.SetCanvasDefX(0) # On-Screen Position
-        self.SetCanvasDefY(0)
-        # Pad
-        self.SetPadBorderMode(0)
-        self.SetPadColor(0)
-        self.SetPadGridX(False)
-        self.SetPadGridY(False)
-        self.SetGridColor(0)
-        self.SetGridStyle(3)
-        self.SetGridWidth(1)
-        # Frame
-        self.SetFrameBorderMode(0)
-        self.SetFrameBorderSize(1)
-        self.SetFrameFillColor(0)
-        self.SetFrameFillStyle(0)
-        self.SetFrameLineColor(1)
-        self.SetFrameLineStyle(1)
-        self.SetFrameLineWidth(1)
-        # Histogram
-        self.SetHistLineColor(1)
-        self.SetHistLineStyle(0)
-        self.SetHistLineWidth(1)
-        self.SetEndErrorSize(2)
-        self.SetMarkerStyle(20)
-        # Fit/Function
-        self.SetOptFit(1)
-        self.SetFitFormat('5.4g')
-        self.SetFuncColor(2)
-        self.SetFuncStyle(1)
-        self.SetFuncWidth(1)
-        # Date
-        self.SetOptDate(0)
-        # Statistics Box
-        self.SetOptFile(0)
-        self.SetOptStat(0) # Pass 'mr' to display the mean and RMS.
-        self.SetStatColor(0)
-        self.SetStatFont(42)
-        self.SetStatFontSize(0.025)
-        self.SetStatTextColor(1)
-        self.SetStatFormat('6.4g')
-        self.SetStatBorderSize(1)
-        self.SetStatH(0.1)
-        self.SetStatW(0.15)
-        # Margins
-        self.SetPadTopMargin(0.05)
-        self.SetPadBottomMargin(0.13)
-        self.SetPadLeftMargin(0.16)
-        self.SetPadRightMargin(0.02)
-        # Global Title
-        self.SetOptTitle(0) # 0 = No Title
-        self.SetTitleFont(42)
-        self.SetTitleColor(1)
-        self.SetTitleTextColor(1)
-        self.SetTitleFillColor(10)
-        self.SetTitleFontSize(0.05)
-        # Axis Titles
-        self.SetTitleColor(1, 'XYZ')
-        self.SetTitleFont(42, 'XYZ')
-        self.SetTitleSize(0.06, 'XYZ')
-        self.SetTitleXOffset(0.9)
-        self.SetTitleYOffset(1.25)
-        # Axis Labels
-        self.SetLabelColor(1, 'XYZ')
-        self.SetLabelFont(42, 'XYZ')
-        self.SetLabelOffset(0.007, 'XYZ')
-        self.SetLabelSize(0.05, 'XYZ')
-        # Axes
-        self.SetAxisColor(1, 'XYZ')
-        self.SetStripDecimals(True)
-        self.SetTickLength(0.03, 'XYZ')
-        self.SetNdivisions(510, 'XYZ')
-        self.SetPadTickX(1) # 0 = Text labels (and ticks) only on bottom, 1 = Text labels on top and bottom
-        self.SetPadTickY(1)
-        # Log Scale Axes
-        self.SetOptLogx(0)
-        self.SetOptLogy(0)
-        self.SetOptLogz(0)
-        # Postscript Options
-        self.SetPaperSize(20, 20)
-        # Hatches
-        self.SetHatchesLineWidth(5)
-        self.SetHatchesSpacing(0.05)
+    @instrument('style_construction')
+    def __init__(self, base=None, spec=TDR_STYLE_SPEC):
+        if base is None:
+            super(TDRStyle, self).__init__(spec.name, spec.title)
+            spec.apply(self)
+        else:
+            super(TDRStyle, self).__init__(base)
+            self.SetName(spec.name)
+            self.SetTitle(spec.title)
+            # Unlike the other constructors, the copy constructor does not
+            # register the style with gROOT, which __enter__ relies on.
+            ROOT.gROOT.GetListOfStyles().Add(self)
+            spec.apply(self, base.spec.delta(spec))
+        self.spec = spec
 
+    @instrument('style_enter')
     def __enter__(self):
-        """Set the gStyle to tdrStyle while remembering the previous gStyle."""
-        self.previous_gStyle = ROOT.gROOT.GetStyle(ROOT.gStyle.GetName())
+        """Set the gStyle to this style while remembering the previous gStyle.
+
+        The previous gStyles are kept on a stack shared by all styles, so the
+        same style object can be entered in nested contexts. Since gStyle is
+        shared by all threads, enter the style before drawing from several
+        threads rather than inside of each of them.
+        """
+        _style_stack.append(ROOT.gROOT.GetStyle(ROOT.gStyle.GetName()))
         self.cd()
         return self
 
+    @instrument('style_exit')
     def __exit__(self, exception_type, exception_value, traceback):
         """Reset to the previous gStyle.
         """
-        self.previous_gStyle.cd()
+        _style_stack.pop().cd()
+
+    @instrument('style_update')
+    def update(self, spec):
+        """Switch the style to the settings of another spec.
 
+        Only the setters of the settings that differ from the current spec are
+        called, so switching between similar styles takes a handful of calls.
+        Settings missing from the other spec keep their current values.
+        """
+        spec.apply(self, self.spec.delta(spec))
+        self.spec = spec
+
+    @contextlib.contextmanager
+    def override(self, settings):
+        """Temporarily override some of the style settings.
+
+        The overridden settings are restored on exiting the context, for which
+        they must be present in the current spec, otherwise a KeyError is raised:
+
+            style = cms_figure.get_style()
+            with style, style.override({'PadRightMargin': 0.15}):
+                # Draw stuff here...
+
+        Parameters
+        ----------
+        settings : mapping or iterable of pairs
+            The attributes and values to override. See `StyleSpec`.
+        """
+        original = self.spec
+        settings = OrderedDict(settings)
+        missing = [attribute for attribute in settings if attribute not in original.settings]
+        if missing:
+            raise KeyError('Unable to restore the style settings missing from the spec: ' + ', '.join(missing))
+        self.update(original.updated(settings))
+        try:
+            yield self
+        finally:
+            self.update(original)
+
+
+def get_style(variant=None):
+    """Return the cached P-TDR style or one of its named variants.
+
+    The base style is built once per process and every variant is derived by
+    copying it and applying the few settings listed in `STYLE_VARIANTS`, rather
+    than setting every style option again. Repeated calls return the same
+    object, which can be used as a context manager as often as needed:
+
+        with cms_figure.get_style('2d'):
+            canvas = ROOT.TCanvas()
+            # Draw stuff here...
+
+    Parameters
+    ----------
+    variant : string, optional
+        One of the following style variants:
+            :wide: An 800x600 canvas
+            :2d: A larger right margin for the palette of COLZ plots
+            :ratio: A taller canvas with pixel sized axis text for ratio plots
+        The default is None for the base P-TDR style.
+    """
+    try:
+        return _style_registry[variant]
+    except KeyError:
+        pass
+    if variant is None:
+        style = TDRStyle()
+    elif variant in STYLE_VARIANTS:
+        base = get_style()
+        spec = base.spec.updated(
+            STYLE_VARIANTS[variant],
+            name='tdrStyle_{0}'.format(variant),
+            title='Style for P-TDR ({0})'.format(variant),
+        )
+        style = TDRStyle(base=base, spec=spec)
+    else:
+        raise ValueError('Unrecognized style variant: {0}'.format(variant))
+    _style_registry[variant] = style
+    return style
@@ -20,13 +20,231 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import subprocess
+import threading
+from multiprocessing.pool import ThreadPool
+
+try:
+    from shutil import which
+except ImportError:
+    from distutils.spawn import find_executable as which
+
 import ROOT
 
+from .instrument import instrument
 from .labels import CMSLabel, LuminosityLabel
+from .session import current_session
+
+
+# The renderers shared by calls to draw_labels, one per thread created on first use.
+_local = threading.local()
+
+
+class LabelRenderer(object):
+    """Draws the figure labels on many canvases using a single set of labels.
+
+    Creating new labels for every figure leaves a trail of label objects
+    behind in long running jobs. A renderer owns one CMS label and one
+    luminosity label and reuses them for every canvas it draws on.
+
+    The primitives it adds to a canvas are named after the label they show,
+    so drawing on a canvas that already has labels updates the existing
+    primitives in place instead of stacking duplicates on top of them.
+
+    A renderer is not thread-safe, but separate renderers can draw on separate
+    pads from several threads at once when ROOT's thread safety is enabled
+    with `ROOT.EnableThreadSafety()`, as long as the pads are given explicitly.
+
+    The label objects are exposed as instance attributes for customization:
+
+    cms_label : CMSLabel
+        The label displaying the CMS name.
+    lumi_label : LuminosityLabel
+        The label displaying the integrated luminosity and center-of-mass energy.
+    """
+
+    # The names of the primitives drawn for the CMS label, its sublabel,
+    # and the luminosity label.
+    CMS_LABEL_NAME = 'cms_figure_cms_label'
+    CMS_SUBLABEL_NAME = 'cms_figure_cms_sublabel'
+    LUMI_LABEL_NAME = 'cms_figure_lumi_label'
+
+    def __init__(self):
+        self.cms_label = CMSLabel()
+        self.lumi_label = LuminosityLabel('')
+
+    def draw(self, lumi_text, cms_position='left', extra_text='', update=True, pad=None):
+        """Draw or update the figure labels on a pad.
+
+        Parameters
+        ----------
+        lumi_text : string
+            The luminosity label text.
+        cms_position : string, optional
+            The CMS label position on the active canvas. The default is "left".
+        extra_text : string, optional
+            The sublabel text for the CMS label. The default is an empty string
+            for no sublabel.
+        update : bool, optional
+            Whether to update the pad afterwards. The default is True.
+        pad : TPad, optional
+            The pad to draw on. The default is the active canvas.
+        """
+        pad = pad or ROOT.gPad
+        margins = self.cms_label.get_canvas_margins(pad)
+        self.draw_cms_label(cms_position, extra_text, margins=margins, pad=pad)
+        self.draw_lumi_label(lumi_text, margins=margins, pad=pad)
+        if update:
+            update_pad(pad)
+
+    def draw_cms_label(self, position='left', extra_text='', scale_factor=1.0, margins=None, pad=None):
+        """Draw or update only the CMS label and its sublabel on a pad.
+
+        Parameters
+        ----------
+        position : string, optional
+            The CMS label position on the active canvas, or "auto" to choose
+            the position clear of the drawn data (which requires NumPy). The
+            default is "left".
+        extra_text : string, optional
+            The sublabel text. The default is an empty string for no sublabel.
+        scale_factor : float, optional
+            A factor applied to the text size scale. The default is 1.0.
+        margins : 4-tuple of floats, optional
+            The top, right, bottom, and left canvas margins. The default is
+            the margins of the pad.
+        pad : TPad, optional
+            The pad to draw on. The default is the active canvas.
+        """
+        pad = pad or ROOT.gPad
+        self.cms_label.sublabel.text = extra_text
+        if position == 'auto':
+            # Imported here since NumPy is an optional dependency.
+            from .auto_placement import auto_position
+            position = auto_position(self.cms_label, pad, scale_factor=scale_factor)
+        self.cms_label.position = position
+        label_placement, sublabel_placement = self.cms_label.layout(margins, scale_factor, pad)
+        self._render(pad, self.CMS_LABEL_NAME, self.cms_label, label_placement, self.cms_label.text)
+        self._render(pad, self.CMS_SUBLABEL_NAME, self.cms_label.sublabel, sublabel_placement, extra_text)
+
+    def draw_lumi_label(self, text, scale_factor=1.0, margins=None, pad=None):
+        """Draw or update only the luminosity label on a pad.
+
+        Parameters
+        ----------
+        text : string
+            The luminosity label text.
+        scale_factor : float, optional
+            A factor applied to the text size scale. The default is 1.0.
+        margins : 4-tuple of floats, optional
+            The top, right, bottom, and left canvas margins. The default is
+            the margins of the pad.
+        pad : TPad, optional
+            The pad to draw on. The default is the active canvas.
+        """
+        pad = pad or ROOT.gPad
+        self.lumi_label.text = text
+        placement = self.lumi_label.layout(margins, scale_factor, pad)
+        self._render(pad, self.LUMI_LABEL_NAME, self.lumi_label, placement, text)
+
+    @staticmethod
+    @instrument('render_label')
+    def _render(pad, name, label, placement, text):
+        """Draw a label's primitive, update it in place, or remove it if it has no placement."""
+        primitives = pad.GetListOfPrimitives()
+        primitive = primitives.FindObject(name)
+        if placement is None:
+            if primitive:
+                primitives.Remove(primitive)
+                # Hand the removed primitive to Python so that it is deleted.
+                ROOT.SetOwnership(primitive, True)
+            return
+        if not primitive:
+            label.draw_placement(placement, text, pad).SetName(name)
+            return
+        label.SetTextSize(placement.size)
+        label.SetTextAlign(placement.align)
+        ROOT.TAttText.Copy(label, primitive)
+        primitive.SetX(placement.x)
+        primitive.SetY(placement.y)
+        primitive.SetTitle(text)
+        pad.Modified()
+
+
+@instrument('pad_update')
+def update_pad(pad):
+    """Update a pad, repainting it and any of its modified subpads.
+
+    Inside of a `DrawingSession`, the update is held back by the session.
+    """
+    session = current_session()
+    if session is None:
+        pad.Update()
+    else:
+        session.defer(pad)
+
+
+def _get_renderer():
+    """Return the renderer shared by the labelling functions on the current thread."""
+    renderer = getattr(_local, 'renderer', None)
+    if renderer is None:
+        renderer = _local.renderer = LabelRenderer()
+    return renderer
+
+
+def get_leaf_pads(pad):
+    """Return the pads of a canvas or pad that are not divided any further.
+
+    An undivided canvas is returned as its own single leaf pad.
+    """
+    subpads = [primitive for primitive in pad.GetListOfPrimitives() if primitive.InheritsFrom('TPad')]
+    if not subpads:
+        return [pad]
+    return [leaf for subpad in subpads for leaf in get_leaf_pads(subpad)]
 
 
-def draw_labels(lumi_text, cms_position='left', extra_text=''):
-    """Draw the CMS Publication Committee figure labels on the active canvas.
+def _pad_scale_factor(canvas, pad):
+    """Return the ratio of the canvas's top margin to the pad's top margin in absolute units."""
+    return canvas.GetTopMargin() / (pad.GetTopMargin() * pad.GetAbsHNDC())
+
+
+@instrument('draw_canvas_labels')
+def draw_canvas_labels(canvas, lumi_text, cms_position='left', extra_text=''):
+    """Draw the CMS Publication Committee figure labels on a divided canvas.
+
+    The pads of the canvas are walked once. The CMS label is drawn on the
+    leftmost pad of the top row and the luminosity label on the rightmost pad
+    of the top row, which are the same pad for a main pad stacked on a ratio
+    pad. The text sizes are rescaled so that the labels appear as large as on
+    an undivided canvas with the canvas's top margin, so the top margin of the
+    labelled pads should leave enough room for them.
+
+    The canvas is updated once after all of the labels are drawn. The active
+    pad is not changed.
+
+    Parameters
+    ----------
+    canvas : TCanvas
+        The canvas, which may be divided into any number of (nested) pads.
+    lumi_text, cms_position, extra_text
+        See `draw_labels`.
+    """
+    renderer = _get_renderer()
+    pads = get_leaf_pads(canvas)
+    # Pad edges are compared with a tolerance since they are floating point.
+    top_edge = max(pad.GetAbsYlowNDC() + pad.GetAbsHNDC() for pad in pads)
+    top_row = [pad for pad in pads if pad.GetAbsYlowNDC() + pad.GetAbsHNDC() > top_edge - 1e-6]
+    cms_pad = min(top_row, key=lambda pad: pad.GetAbsXlowNDC())
+    lumi_pad = max(top_row, key=lambda pad: pad.GetAbsXlowNDC() + pad.GetAbsWNDC())
+    renderer.draw_cms_label(cms_position, extra_text, scale_factor=_pad_scale_factor(canvas, cms_pad), pad=cms_pad)
+    renderer.draw_lumi_label(lumi_text, scale_factor=_pad_scale_factor(canvas, lumi_pad), pad=lumi_pad)
+    canvas.Modified()
+    update_pad(canvas)
+
+
+@instrument('draw_labels')
+def draw_labels(lumi_text, cms_position='left', extra_text='', pad=None):
+    """Draw the CMS Publication Committee figure labels on a pad.
 
     Parameters
     ----------
@@ -39,17 +257,151 @@ def draw_labels(lumi_text, cms_position='left', extra_text=''):
             :center: The top center inside the frame
             :right: The top right corner inside the frame
             :outside: The top left corner outside the frame
+            :auto: The first of left, center, or right that is clear of the
+                   drawn histograms, stacks, and graphs, raising the frame
+                   maximum just enough if none is (requires NumPy)
     extra_text : string, optional
         The sublabel text positioned below the CMS label inside of the frame
         or to the right of the CMS label outside of the frame. Common examples
         are "Preliminary", "Simulation", or "Unpublished". The default is an
         empty string for no sublabel.
+    pad : TPad, optional
+        The pad to draw on. The default is the active canvas.
+
+    The labels are drawn by a `LabelRenderer` shared by the calls on the same
+    thread, so calling this function again on a labelled canvas updates the
+    existing labels. With ROOT's thread safety enabled, different canvases can
+    be labelled from several threads at once by passing them as `pad`, which
+    leaves gPad untouched.
     """
-    cms_label = CMSLabel()
-    cms_label.position = cms_position
-    cms_label.sublabel.text = extra_text
-    cms_label.draw()
-    lumi_label = LuminosityLabel(lumi_text)
-    lumi_label.draw()
-    ROOT.gPad.Update()
+    _get_renderer().draw(lumi_text, cms_position, extra_text, pad=pad)
+
+
+
+class FigureExporter(object):
+    """Saves labelled canvases to several file formats at once.
+
+    Each canvas is painted once and the vector formats and ROOT formats are
+    written directly. If a PDF is written as well and Ghostscript is available,
+    the raster formats are converted from the PDF by a pool of background
+    threads instead of painting the canvas again, so the next figure can be
+    drawn in the meantime. Otherwise, they are saved by ROOT.
+
+    A failed conversion raises its error from the next call to `export` after
+    it finished. The number of outstanding conversions is bounded, so exporting
+    waits for the oldest one when the background threads fall behind.
+
+    The exporter should be closed when done, which waits for any outstanding
+    conversions, for example by using it as a context manager:
+
+        with cms_figure.FigureExporter() as exporter:
+            for name in names:
+                canvas = ROOT.TCanvas()
+                # Draw stuff here...
+                cms_figure.draw_labels('19.7 fb^{-1} (8 TeV)')
+                exporter.export(canvas, name)
+
+    Parameters
+    ----------
+    formats : iterable of strings, optional
+        The file extensions to write. The default is PDF, PNG, C macro, and
+        ROOT file.
+    workers : int, optional
+        The number of background threads converting raster formats. The
+        default is 2.
+    ghostscript : string, optional
+        The Ghostscript executable. The default is "gs" found on the PATH.
+    max_pending : int, optional
+        The maximum number of outstanding conversions. The default is four
+        times the number of workers.
+    """
+
+    # The formats that Ghostscript can convert a PDF to, keyed by extension.
+    RASTER_DEVICES = {
+        'png': 'png16m',
+        'jpg': 'jpeg',
+        'jpeg': 'jpeg',
+        'tiff': 'tiff24nc',
+    }
+
+    def __init__(self, formats=('pdf', 'png', 'C', 'root'), workers=2, ghostscript='gs', max_pending=None):
+        self.formats = list(formats)
+        self.ghostscript = which(ghostscript)
+        self.max_pending = max_pending or 4 * workers
+        self._pool = ThreadPool(workers) if self.ghostscript else None
+        self._conversions = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    @instrument('export')
+    def export(self, canvas, basename):
+        """Paint a canvas once and save it in every format.
+
+        Parameters
+        ----------
+        canvas : TCanvas
+            The labelled canvas.
+        basename : string
+            The output file path without an extension.
+
+        Returns
+        -------
+        list of strings
+            The output file paths, including those still being converted.
+        """
+        self._collect()
+        session = current_session()
+        if session is None:
+            canvas.Update()
+        else:
+            session.flush(canvas)
+        paths = ['{0}.{1}'.format(basename, extension) for extension in self.formats]
+        converted = 'pdf' in self.formats and self._pool is not None
+        pdf_path = '{0}.pdf'.format(basename)
+        for extension, path in zip(self.formats, paths):
+            if not (converted and extension in self.RASTER_DEVICES):
+                canvas.SaveAs(path)
+        if converted:
+            width, height = canvas.GetWw(), canvas.GetWh()
+            for extension, path in zip(self.formats, paths):
+                if extension in self.RASTER_DEVICES:
+                    command = [
+                        self.ghostscript, '-q', '-dSAFER', '-dBATCH', '-dNOPAUSE',
+                        '-sDEVICE={0}'.format(self.RASTER_DEVICES[extension]),
+                        '-g{0}x{1}'.format(width, height), '-dPDFFitPage',
+                        '-dTextAlphaBits=4', '-dGraphicsAlphaBits=4',
+                        '-sOutputFile={0}'.format(path), pdf_path,
+                    ]
+                    while len(self._conversions) >= self.max_pending:
+                        self._conversions.pop(0).get()
+                    self._conversions.append(self._pool.apply_async(subprocess.check_call, (command,)))
+        return paths
+
+    def _collect(self):
+        """Drop the finished conversions, raising the first error encountered."""
+        pending, finished = [], []
+        for conversion in self._conversions:
+            (finished if conversion.ready() else pending).append(conversion)
+        self._conversions = pending
+        for conversion in finished:
+            conversion.get()
+
+    def wait(self):
+        """Wait for the outstanding conversions, raising the first error encountered."""
+        conversions, self._conversions = self._conversions, []
+        for conversion in conversions:
+            conversion.get()
 
+    def close(self):
+        """Wait for the outstanding conversions and stop the background threads."""
+        try:
+            self.wait()
+        finally:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
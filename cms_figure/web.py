@@ -0,0 +1,148 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Exporting labelled canvases as JSON for web galleries rendered with JSROOT."""
+
+import gzip
+import json
+import os
+import re
+
+import ROOT
+
+from .instrument import instrument
+from .tdr_style import get_style
+
+
+# The TBufferJSON layout of the exported objects: no whitespace (3) plus the
+# suppression of leading and trailing zeros and the compression of runs of
+# the same value in arrays (40, kSameSuppression), which JSROOT reads.
+JSON_COMPACT = 43
+
+
+class GalleryExporter(object):
+    """Writes canvases as JSROOT JSON files and an index for a web gallery.
+
+    Rasterizing thousands of figures to PNG dominates the cost of publishing
+    them on a web page. Instead, each canvas is serialized with TBufferJSON,
+    including its label primitives, and drawn by JSROOT in the browser. The
+    style the figures were drawn with is written once as "style.json", and an
+    "index.json" listing every figure is written when the exporter is closed:
+
+        with cms_figure.GalleryExporter('gallery') as gallery:
+            for name in names:
+                # Draw stuff here...
+                cms_figure.draw_labels('19.7 fb^{-1} (8 TeV)', pad=canvas)
+                gallery.add(canvas, title=name)
+
+    Each figure is written as soon as it is added and only its index entry is
+    kept, so an exporter can take any number of figures. It is also a sink for
+    `render_batch`, which then adds the canvas of every successful job.
+
+    Parameters
+    ----------
+    directory : string
+        The output directory, which is created if needed.
+    compress : bool, optional
+        Whether to gzip the JSON files, which are then named "*.json.gz".
+        The default is True.
+    style : TStyle, optional
+        The style the figures were drawn with, which is written to
+        "style.json". The default is the base P-TDR style from `get_style`,
+        which is also the style of the `render_batch` workers. The current
+        gStyle is not used, since the figures of a batch are drawn in other
+        processes.
+    """
+    def __init__(self, directory, compress=True, style=None):
+        self.directory = directory
+        self.compress = compress
+        self.style = style
+        self.entries = []
+        # The file name stems in use, reserving those of the style and index.
+        self._names = {'style', 'index'}
+        self._style_file = None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def _write(self, obj, name):
+        """Serialize an object to a JSON file in the output directory and return the file name."""
+        data = str(ROOT.TBufferJSON.ToJSON(obj, JSON_COMPACT)).encode('utf-8')
+        if self.compress:
+            filename = name + '.json.gz'
+            with gzip.open(os.path.join(self.directory, filename), 'wb', 6) as f:
+                f.write(data)
+        else:
+            filename = name + '.json'
+            with open(os.path.join(self.directory, filename), 'wb') as f:
+                f.write(data)
+        return filename
+
+    def _unique_name(self, name):
+        """Return a file name stem derived from a figure name that no other figure uses."""
+        stem = re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_.') or 'figure'
+        candidate, suffix = stem, 1
+        while candidate in self._names:
+            suffix += 1
+            candidate = '{0}_{1}'.format(stem, suffix)
+        self._names.add(candidate)
+        return candidate
+
+    @instrument('gallery_add')
+    def add(self, canvas, title=None, name=None):
+        """Write a canvas to a JSON file and add it to the index.
+
+        Parameters
+        ----------
+        canvas : TCanvas
+            The labelled canvas.
+        title : string, optional
+            The title shown in the gallery. The default is None.
+        name : string, optional
+            The stem of the file name. The default is derived from the title,
+            or the figure's position in the gallery without one.
+
+        Returns
+        -------
+        string
+            The path of the written file.
+        """
+        if self._style_file is None:
+            self._style_file = self._write(self.style or get_style(), 'style')
+        name = self._unique_name(name or title or 'figure_{0}'.format(len(self.entries)))
+        filename = self._write(canvas, name)
+        self.entries.append({'name': name, 'title': title or name, 'file': filename})
+        return os.path.join(self.directory, filename)
+
+    def close(self):
+        """Write the gallery index listing the style file and the figures."""
+        index = {'style': self._style_file, 'figures': self.entries}
+        path = os.path.join(self.directory, 'index.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(index, f, indent=1)
+            f.write('\n')
+        os.rename(path + '.tmp', path)
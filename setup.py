@@ -4,13 +4,6 @@ import re
 from setuptools import setup, find_packages
 
 
-try:
-    import ROOT
-except ImportError:
-    raise ImportError('Unable to import ROOT. Please check that ROOT and its Python bindings are installed.')
-ROOT.PyConfig.IgnoreCommandLineOptions = True
-
-
 VERSION_RE = re.compile(r'__version__\s+=\s+(.*)')
 
 
@@ -22,6 +15,16 @@ setup(
     name='cms_figure',
     version=version,
     packages=find_packages(),
+    extras_require={
+        'numpy': ['numpy'],
+        'matplotlib': ['matplotlib'],
+    },
+    entry_points={
+        'console_scripts': [
+            'cms-figure = cms_figure.cli:main',
+            'cms-figure-daemon = cms_figure.daemon:main',
+        ],
+    },
     description='Styling and labels for CMS figures produced using ROOT',
     author='Sean-Jiun Wang',
     author_email='sean.jiun.wang@gmail.com',
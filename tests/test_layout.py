@@ -0,0 +1,146 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Check the label layout against the formulas of the original ROOT labels.
+
+The reference functions below transcribe the drawing methods of `CMSLabel`
+and `LuminosityLabel` before the layout was split out of them, so these tests
+run without ROOT.
+"""
+
+import pytest
+
+from cms_figure.layout import (
+    CMS_LABEL_DEFAULTS, CMS_SUBLABEL_DEFAULTS, LUMI_LABEL_DEFAULTS, LabelPositionError,
+    cms_label_layout, luminosity_label_layout,
+)
+
+
+POSITIONS = ('left', 'center', 'right', 'outside')
+
+# The margins (top, right, bottom, left) of the P-TDR canvases and some others.
+MARGINS = [
+    (0.05, 0.04, 0.13, 0.16),
+    (0.08, 0.15, 0.12, 0.12),
+    (0.1, 0.1, 0.1, 0.1),
+]
+
+
+def reference_cms_label(margins, position, padding_top=None):
+    """Return the coordinates, size, and alignment of the CMS label and its sublabel."""
+    top_margin, right_margin, bottom_margin, left_margin = margins
+    size = 0.75 * top_margin
+    if position == 'left':
+        align = 13
+        x = left_margin + 0.045 * (1 - left_margin - right_margin)
+        y = 1 - top_margin - (padding_top or 0.035) * (1 - top_margin - bottom_margin)
+    elif position == 'center':
+        align = 23
+        x = left_margin + 0.5 * (1 - left_margin - right_margin)
+        y = 1 - top_margin - (padding_top or 0.035) * (1 - top_margin - bottom_margin)
+    elif position == 'right':
+        align = 33
+        x = 1 - right_margin - 0.045 * (1 - left_margin - right_margin)
+        y = 1 - top_margin - (padding_top or 0.035) * (1 - top_margin - bottom_margin)
+    else:
+        align = 11
+        x = left_margin
+        y = 1 - (padding_top or 0.8) * top_margin
+    if position == 'outside':
+        x_sublabel = left_margin + 0.12 * (1 - left_margin - right_margin)
+        y_sublabel = y
+    else:
+        x_sublabel = x
+        y_sublabel = y - 1.2 * size
+    return (x, y, size, align), (x_sublabel, y_sublabel, 0.76 * size, align)
+
+
+def reference_luminosity_label(margins):
+    """Return the coordinates, size, and alignment of the luminosity label."""
+    top_margin, right_margin, _, _ = margins
+    return 1 - right_margin, 1 - 0.8 * top_margin, 0.6 * top_margin, 31
+
+
+def cms_layout_arguments(sublabel):
+    return dict(
+        scale=CMS_LABEL_DEFAULTS['scale'],
+        padding_left=CMS_LABEL_DEFAULTS['padding_left'],
+        padding_right=CMS_LABEL_DEFAULTS['padding_right'],
+        padding_top=CMS_LABEL_DEFAULTS['padding_top'],
+        sublabel=sublabel,
+        sublabel_scale=CMS_SUBLABEL_DEFAULTS['scale'],
+        sublabel_padding_left=CMS_SUBLABEL_DEFAULTS['padding_left'],
+        sublabel_padding_top=CMS_SUBLABEL_DEFAULTS['padding_top'],
+    )
+
+
+@pytest.mark.parametrize('margins', MARGINS)
+@pytest.mark.parametrize('position', POSITIONS)
+def test_cms_label_without_sublabel(margins, position):
+    label, sublabel = cms_label_layout(margins, position, **cms_layout_arguments(False))
+    expected, _ = reference_cms_label(margins, position)
+    assert tuple(label) == pytest.approx(expected)
+    assert sublabel is None
+
+
+@pytest.mark.parametrize('margins', MARGINS)
+@pytest.mark.parametrize('position', POSITIONS)
+def test_cms_label_with_sublabel(margins, position):
+    label, sublabel = cms_label_layout(margins, position, **cms_layout_arguments(True))
+    expected_label, expected_sublabel = reference_cms_label(margins, position)
+    assert tuple(label) == pytest.approx(expected_label)
+    assert tuple(sublabel) == pytest.approx(expected_sublabel)
+
+
+@pytest.mark.parametrize('position', POSITIONS)
+def test_cms_label_padding_top(position):
+    margins = MARGINS[0]
+    label, sublabel = cms_label_layout(margins, position, padding_top=0.1, sublabel=True)
+    expected_label, expected_sublabel = reference_cms_label(margins, position, padding_top=0.1)
+    assert tuple(label) == pytest.approx(expected_label)
+    assert tuple(sublabel) == pytest.approx(expected_sublabel)
+
+
+def test_cms_label_defaults():
+    margins = MARGINS[0]
+    assert cms_label_layout(margins) == cms_label_layout(margins, **cms_layout_arguments(False))
+
+
+def test_cms_label_unknown_position():
+    with pytest.raises(LabelPositionError):
+        cms_label_layout(MARGINS[0], 'bottom')
+
+
+@pytest.mark.parametrize('margins', MARGINS)
+def test_luminosity_label(margins):
+    placement = luminosity_label_layout(
+        margins,
+        scale=LUMI_LABEL_DEFAULTS['scale'],
+        align=LUMI_LABEL_DEFAULTS['align'],
+        padding_top=LUMI_LABEL_DEFAULTS['padding_top'],
+    )
+    assert tuple(placement) == pytest.approx(reference_luminosity_label(margins))
+    assert luminosity_label_layout(margins) == placement
+
+
+def test_luminosity_label_alignment_names():
+    margins = MARGINS[0]
+    assert luminosity_label_layout(margins, align=('right', 'bottom')).align == 31
@@ -0,0 +1,175 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Check the luminosity totals of synthetic brilcalc CSV exports.
+
+These tests need NumPy but not ROOT.
+"""
+
+from collections import OrderedDict
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from cms_figure import lumi
+
+
+PER_LS_HEADER = '#run:fill,ls,time,beamstatus,E(GeV),delivered(/pb),recorded(/pb),avgpu,source\n'
+
+# The run, lumisection, beam energy, and recorded luminosity in /pb of each row.
+PER_LS_ROWS = [
+    (100, 1, 6500, 100.0),
+    (100, 2, 6500, 100.0),
+    (100, 3, 6500, 100.0),
+    (100, 4, 6500, 100.0),
+    (200, 1, 6500, 200.0),
+    (200, 2, 6500, 200.0),
+    (300, 1, 4000, 1000.0),
+]
+
+PER_RUN_HEADER = '#run:fill,time,nls,ncms,delivered(/pb),recorded(/pb)\n'
+
+# The run and recorded luminosity in /pb of each row.
+PER_RUN_ROWS = [(100, 400.0), (200, 400.0), (300, 1000.0)]
+
+CERTIFIED = {'100': [[2, 3]], '200': [[1, 2]], '300': []}
+
+PERIODS = {'A': [100, 150], 'B': [200, 200]}
+
+
+@pytest.fixture
+def per_ls_csv(tmpdir):
+    lines = ['#Data tag : 19v3 , Norm tag: None\n', PER_LS_HEADER]
+    for run, ls, beam_energy, recorded in PER_LS_ROWS:
+        lines.append('{0}:5000,{1}:{1},05/10/16 05:00:00,STABLE BEAMS,{2},{3},{3},10.0,HFOC\n'.format(
+            run, ls, beam_energy, recorded))
+    lines.extend(['#Summary:\n', '#nfill,nrun,nls,ncms,totdelivered(/pb),totrecorded(/pb)\n', '#1,3,7,7,1800,1800\n'])
+    path = tmpdir.join('lumi_byls.csv')
+    path.write(''.join(lines))
+    return str(path)
+
+
+@pytest.fixture
+def per_run_csv(tmpdir):
+    lines = ['#Data tag : 19v3 , Norm tag: None\n', PER_RUN_HEADER]
+    for run, recorded in PER_RUN_ROWS:
+        lines.append('{0}:5000,05/10/16 05:00:00,10,10,{1},{1}\n'.format(run, recorded))
+    path = tmpdir.join('lumi_byrun.csv')
+    path.write(''.join(lines))
+    return str(path)
+
+
+def totals(paths, **kwargs):
+    kwargs.setdefault('cache_dir', None)
+    return [(group, round(value, 9)) for group, value in lumi.integrated_luminosity(paths, **kwargs).items()]
+
+
+def test_columns_with_colons():
+    row = '100:5000,1:1,05/10/16 05:00:00,STABLE BEAMS,6500,100.0,100.0,10.0,HFOC\n'
+    columns = lumi._columns(PER_LS_HEADER, row)
+    assert columns['run'] == (0, 'run:fill')
+    assert columns['ls'] == (2, 'ls')
+    # The time of day holds two colons.
+    assert columns['beamstatus'][0] == 7
+    assert columns['E'] == (8, 'E(GeV)')
+    assert columns['recorded'] == (10, 'recorded(/pb)')
+
+
+def test_columns_length_mismatch():
+    with pytest.raises(lumi.LumiFormatError):
+        lumi._columns(PER_LS_HEADER, '100:5000,1:1\n')
+
+
+def test_read_per_ls(per_ls_csv):
+    table = lumi.read_lumi_csv(per_ls_csv)
+    assert table['run'].tolist() == [row[0] for row in PER_LS_ROWS]
+    assert table['ls'].tolist() == [row[1] for row in PER_LS_ROWS]
+    assert table['energy'].tolist() == [13.0] * 6 + [8.0]
+    assert table['recorded'] == pytest.approx([row[3] / 1000.0 for row in PER_LS_ROWS])
+
+
+def test_read_per_run(per_run_csv):
+    table = lumi.read_lumi_csv(per_run_csv)
+    assert table['run'].tolist() == [100, 200, 300]
+    assert 'ls' not in table
+    assert 'energy' not in table
+    assert table['recorded'] == pytest.approx([0.4, 0.4, 1.0])
+
+
+def test_read_in_chunks(per_ls_csv):
+    chunks = list(lumi.iter_lumi_csv(per_ls_csv, chunk_rows=3))
+    assert [len(chunk['run']) for chunk in chunks] == [3, 3, 1]
+    whole = lumi.read_lumi_csv(per_ls_csv)
+    for name in whole:
+        assert np.concatenate([chunk[name] for chunk in chunks]).tolist() == whole[name].tolist()
+    assert lumi.read_lumi_csv(per_ls_csv, chunk_rows=2)['recorded'].tolist() == whole['recorded'].tolist()
+
+
+def test_certified_mask():
+    runs = np.array([100, 100, 100, 100, 200, 300, 400], dtype=np.int64)
+    lumisections = np.array([1, 2, 3, 4, 1, 1, 1], dtype=np.int64)
+    mask = lumi.certified_mask(runs, lumisections, CERTIFIED)
+    assert mask.tolist() == [False, True, True, False, True, False, False]
+    # Per run, any run with a certified lumisection is kept.
+    assert lumi.certified_mask(runs, None, CERTIFIED).tolist() == [True] * 5 + [False, False]
+    assert not lumi.certified_mask(runs, lumisections, {}).any()
+
+
+def test_totals_per_ls(per_ls_csv):
+    assert totals(per_ls_csv) == [((None, 13.0), 0.8), ((None, 8.0), 1.0)]
+
+
+def test_totals_certified_and_periods(per_ls_csv):
+    # The first and last runs of a period are part of it, and run 300 is outside of every period.
+    assert totals(per_ls_csv, certified=CERTIFIED, periods=PERIODS) == [(('A', 13.0), 0.2), (('B', 13.0), 0.4)]
+    assert totals(per_ls_csv, periods=PERIODS) == [(('A', 13.0), 0.4), (('B', 13.0), 0.4)]
+
+
+def test_totals_certified_file(per_ls_csv, tmpdir):
+    path = tmpdir.join('certified.json')
+    path.write('{"100": [[2, 3]], "200": [[1, 2]], "300": []}')
+    assert totals(per_ls_csv, certified=str(path)) == [((None, 13.0), 0.6)]
+
+
+def test_totals_per_run(per_run_csv):
+    assert totals(per_run_csv, certified=CERTIFIED, energy=13) == [((None, 13.0), 0.8)]
+    with pytest.raises(lumi.LumiFormatError):
+        totals(per_run_csv)
+
+
+def test_disk_cache(per_ls_csv, tmpdir, monkeypatch):
+    cache_dir = str(tmpdir.join('cache'))
+    computed = lumi.integrated_luminosity(per_ls_csv, CERTIFIED, PERIODS, cache_dir=cache_dir)
+    assert len(tmpdir.join('cache').listdir()) == 1
+    # The totals are read back from the disk instead of the CSV file.
+    monkeypatch.setattr(lumi, '_totals_cache', {})
+    monkeypatch.setattr(lumi, 'iter_lumi_csv', None)
+    cached = lumi.integrated_luminosity(per_ls_csv, CERTIFIED, PERIODS, cache_dir=cache_dir)
+    assert isinstance(cached, OrderedDict)
+    assert list(cached.items()) == list(computed.items())
+
+
+def test_format_lumi_text():
+    text = lumi.format_lumi_text(OrderedDict([((None, 13.0), 0.8), ((None, 8.0), 19.71)]))
+    assert text == '800.0 pb^{-1} (13 TeV) + 19.7 fb^{-1} (8 TeV)'
+    text = lumi.format_lumi_text(OrderedDict([(('2016', 13.0), 36.33), (('2017', 13.0), 41.53)]), precision=2)
+    assert text == '36.33 fb^{-1} (2016, 13 TeV) + 41.53 fb^{-1} (2017, 13 TeV)'
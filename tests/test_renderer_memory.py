@@ -0,0 +1,76 @@
+# MIT License
+# 
+# Copyright (c) 2017 Sean-Jiun Wang
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Check that resident memory stays flat while labelling many canvases.
+
+A single canvas is labelled over and over (as a long running job redrawing
+its figure would) and a fresh canvas is labelled every cycle, sampling the
+resident memory along the way. These tests need ROOT and Linux.
+"""
+
+import os
+
+import pytest
+
+ROOT = pytest.importorskip('ROOT')
+
+import cms_figure
+
+
+# The number of draw cycles.
+CYCLES = 10000
+
+# The allowed growth of the resident memory in MB after the warm-up cycles.
+TOLERANCE = 2.0
+
+
+def rss_mb():
+    """Return the current resident memory of the process in MB."""
+    with open('/proc/self/statm') as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024.0 ** 2
+
+
+def run(cycles, fresh_canvas):
+    """Label canvases for a number of cycles and return the RSS samples."""
+    renderer = cms_figure.LabelRenderer()
+    canvas = ROOT.TCanvas('canvas', '')
+    samples = []
+    for cycle in range(cycles):
+        if fresh_canvas:
+            canvas.Close()
+            canvas = ROOT.TCanvas('canvas', '')
+        renderer.draw('19.7 fb^{-1} (8 TeV)', 'left', 'Preliminary' if cycle % 2 else '')
+        if cycle % (cycles // 20 or 1) == 0:
+            samples.append(rss_mb())
+    canvas.Close()
+    return samples
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/statm'), reason='requires /proc/self/statm')
+@pytest.mark.parametrize('fresh_canvas', [False, True], ids=['same canvas', 'fresh canvas'])
+def test_renderer_memory(fresh_canvas):
+    ROOT.gROOT.SetBatch(True)
+    with cms_figure.get_style():
+        samples = run(CYCLES, fresh_canvas)
+    # The first samples include one-off allocations by ROOT.
+    growth = samples[-1] - samples[len(samples) // 4]
+    assert growth <= TOLERANCE, 'RSS grew by {0:.2f} MB over {1} cycles'.format(growth, CYCLES)